@@ -1,9 +1,22 @@
 #!/usr/bin/python
 
 import struct
-import shutil
+import array
+import codecs
 import argparse
 import os
+import sys
+import io
+import logging
+import contextvars
+import json
+import hashlib
+import datetime
+import contextlib
+import zipfile
+import tarfile
+import multiprocessing
+import collections
 from operator import xor
 
 ###################################################
@@ -30,6 +43,13 @@ PLAYERPARTY_COUNTOFFSET = 0x234
 FIRSTPKMN_OFFSET = 0x238
 FIRSTPKMN_IN_BOX_OFFSET = 4
 PKMNBOX_STRUCT_SIZE = 80
+# Positions of the substructures type{0,1,2,3} in a PokemonBox for each personality % 24 (see getTypes)
+SUBSTRUCT_POSITIONS = (
+    (0,1,2,3), (0,1,3,2), (0,2,1,3), (0,3,1,2), (0,2,3,1), (0,3,2,1),
+    (1,0,2,3), (1,0,3,2), (2,0,1,3), (3,0,1,2), (2,0,3,1), (3,0,2,1),
+    (1,2,0,3), (1,3,0,2), (2,1,0,3), (3,1,0,2), (2,3,0,1), (3,2,0,1),
+    (1,2,3,0), (1,3,2,0), (2,1,3,0), (3,1,2,0), (2,3,1,0), (3,2,1,0),
+)
 
 SECTOR_DATA_SIZE = SECTOR_DATA_SIZE_V1 # The initial value will be altered whithin the function "prepareGlobalsForVersion"
 SECTOR_FOOTER_SIZE = SECTOR_FOOTER_SIZE_V1
@@ -45,6 +65,48 @@ SHINY_ODDS = 655
 
 SAVE_SECTOR_STRUCT = None
 
+logger = logging.getLogger('savconverter')
+# Name of the .sav being processed, added to the log records by SavfileLogFilter
+CURRENT_SAVFILE = contextvars.ContextVar('CURRENT_SAVFILE', default=None)
+# The footer (id, checksum, security, counter) always takes the last 12 bytes of a sector, whatever the version
+SECTOR_FOOTER_STRUCT = struct.Struct('<HHII')
+# Value of the security field of the sectors that were written by the game
+SECTOR_SIGNATURE = 0x08012025
+
+# A .sav file is made of NSECTORS sectors. Some emulators append a few bytes (RTC data) at the end
+SAV_MIN_SIZE = NSECTORS*SECTOR_SIZE
+SAV_MAX_SIZE = NSECTORS*SECTOR_SIZE + SECTOR_SIZE - 1
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# Pockets of the bag of the 1.3.2 version (items, key items, balls, TMs/HMs and berries, back to back):
+# (first item id, last item id, first slot, number of slots). The key items (slots 30 to 59) are not
+# included, as the range of their ids is not known (see bagItemsToVersion2 for the ranges)
+BAG_POCKETS_V1 = (
+    (28, 245, 0, 30),    # Items
+    (1, 27, 60, 16),     # Poke Balls
+    (582, 689, 76, 64),  # TMs and HMs
+    (514, 581, 140, 46), # Berries
+)
+
+# Folder of the backup store, next to the .sav files (see backupFile)
+BACKUP_STORE_DIR = '.savbackups'
+BATCH_JOURNAL_NAME = '.journal.jsonl'
+
+# Sections of a .sav file that can be decoded independently (see processSavFile)
+SAVE_FIELDS = ('trainer', 'party', 'items', 'boxes', 'dex')
+# Sections that are only decoded when they are explicitly requested
+EXTRA_FIELDS = ('hof',)
+
+##
+# Hall of Fame, Trainer Hill and Recorded Battle blocks
+HALL_OF_FAME_MAX_TEAMS = 50
+# struct HallofFameMon: u32 tid; u32 personality; u16 isShiny:1, species:15; u8 lvl; u8 nickname[10]; (+3 padding bytes)
+HOF_MON_STRUCT = struct.Struct('<IIHB10s3x')
+# struct TrainerHillChallenge: u8 numTrainers; u8 unused; u8 numFloors; u32 checksum;
+TRAINER_HILL_HEADER_STRUCT = struct.Struct('<BxBxI')
+# struct RecordedBattleSave, after the two parties: names[4][8]; genders[4]; u32 trainerIds[4]; languages[4]; u32 rngSeed; u32 battleFlags
+RECORDED_BATTLE_PLAYERS_STRUCT = struct.Struct('<32s4s4I4sII')
+
 
 def prepareGlobalsForVersion(ver):
     """
@@ -96,45 +158,250 @@ def prepareGlobalsForVersion(ver):
 ##################
 # Misc functions #
 ##################
-def backupFileIfNeeded(ifile, ofile):
+class SavfileLogFilter(logging.Filter):
     """
-    Check if the output file exists. If it does, do nothing.
-    Otherwise, create a backup of the input file with the name of the output file.
-    
-    :param ifile: Path to the input file to be backed up.
-    :param ofile: Path to the output file (backup file).
+    Add the name of the .sav being processed (see savfileContext) to the log records as 'savfile'
+    """
+    def filter(self, record):
+        name = CURRENT_SAVFILE.get()
+        record.savfile = f"{name}: " if name else ""
+        return True
+
+
+@contextlib.contextmanager
+def savfileContext(name):
+    """
+    Set the name of the .sav that is reported in the log records of the block
     """
-    # Check if the output file exists
-    if os.path.exists(ofile):
-        print(f"Output file '{ofile}' already exists. No action taken.")
+    token = CURRENT_SAVFILE.set(name)
+    try:
+        yield
+    finally:
+        CURRENT_SAVFILE.reset(token)
+
+
+def configureLogging(verbose=False, quiet=False):
+    """
+    Send the log records to stderr. By default the informative messages are shown; verbose adds the
+    debugging ones (a line per sector) and quiet disables the logging.
+    """
+    handler = logging.StreamHandler()
+    handler.addFilter(SavfileLogFilter())
+    handler.setFormatter(logging.Formatter('[%(levelname)s] %(savfile)s%(message)s'))
+    logger.addHandler(handler)
+    logger.propagate = False
+    if quiet:
+        logger.setLevel(logging.CRITICAL + 1)
     else:
-        try:
-            # Copy the input file to the output file location
-            shutil.copy2(ifile, ofile)
-            print(f"Backup created: '{ofile}'")
-        except Exception as e:
-            print(f"Error while creating backup: {e}")
+        logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+
+def writeFileAtomically(path, data):
+    """
+    Write the data to a temporary file in the same folder and move it to its final path,
+    so the file is either complete or not present at all.
+    """
+    tmpPath = f"{path}.tmp{os.getpid()}"
+    with open(tmpPath, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmpPath, path)
+
+
+def hashFile(path):
+    """
+    Return the SHA-256 (hex) of the content of a file
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def getBackupStore(savfile):
+    """
+    Default location of the backup store: a folder next to the .sav file.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(savfile)), BACKUP_STORE_DIR)
+
+
+def backupFile(ifile, store=None):
+    """
+    Create a snapshot of a file in the backup store.
+
+    The file is split in chunks of SECTOR_SIZE bytes (the 32 sectors of the .sav plus any trailing bytes).
+    The data of every chunk (without its footer) is stored once, under the name of its SHA-256 hash.
+    A snapshot is a JSON manifest with the list of hashes and the footers. The footers are kept apart because
+    every save writes a new counter in all the sectors of the slot, so the sectors whose data did not change
+    between versions do not take any space.
+
+        <store>/sectors/<hash[:2]>/<hash>
+        <store>/snapshots/<snapshot id>.json
+
+    :param ifile: Path to the file to be backed up.
+    :param store: Path to the backup store. By default, getBackupStore(ifile).
+    :return: The id of the snapshot.
+    """
+    if store is None:
+        store = getBackupStore(ifile)
+    with open(ifile, 'rb') as f:
+        raw = f.read()
+    fileHash = hashlib.sha256(raw).hexdigest()
+    hashes = []
+    footers = []
+    written = 0
+    for offset in range(0, len(raw), SECTOR_SIZE):
+        chunk = raw[offset:offset+SECTOR_SIZE]
+        footer = b''
+        if len(chunk) == SECTOR_SIZE: # id, checksum, security and counter (see SECTOR_FOOTER_STRUCT)
+            chunk, footer = chunk[:-SECTOR_FOOTER_STRUCT.size], chunk[-SECTOR_FOOTER_STRUCT.size:]
+        chunkHash = hashlib.sha256(chunk).hexdigest()
+        chunkPath = os.path.join(store, 'sectors', chunkHash[:2], chunkHash)
+        if not os.path.exists(chunkPath):
+            os.makedirs(os.path.dirname(chunkPath), exist_ok=True)
+            writeFileAtomically(chunkPath, chunk)
+            written += 1
+        hashes.append(chunkHash)
+        footers.append(footer.hex())
+    created = datetime.datetime.now()
+    snapshotId = f"{created.strftime('%Y%m%d-%H%M%S-%f')}-{fileHash[:12]}"
+    manifest = {
+        'id':      snapshotId,
+        'source':  os.path.abspath(ifile),
+        'created': created.isoformat(timespec='seconds'),
+        'size':    len(raw),
+        'sha256':  fileHash,
+        'sectors': hashes,
+        'footers': footers,
+    }
+    os.makedirs(os.path.join(store, 'snapshots'), exist_ok=True)
+    writeFileAtomically(os.path.join(store, 'snapshots', snapshotId + '.json'), json.dumps(manifest, indent=1).encode())
+    logger.info("Backup of '%s' created: '%s' (%d of %d sectors stored in '%s')", ifile, snapshotId, written, len(hashes), store)
+    return snapshotId
+
+
+def listBackups(store, savfile=None):
+    """
+    Return the manifests of the snapshots in the backup store, from the oldest to the newest.
+
+    :param store: Path to the backup store.
+    :param savfile: If given, only the snapshots of this file are returned.
+    """
+    snapshotsDir = os.path.join(store, 'snapshots')
+    if not os.path.isdir(snapshotsDir):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(snapshotsDir)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(snapshotsDir, name), 'r') as f:
+            manifest = json.load(f)
+        if savfile is None or manifest['source'] == os.path.abspath(savfile):
+            manifests.append(manifest)
+    return manifests
+
+
+def restoreBackup(store, snapshotId, outputPath):
+    """
+    Rebuild the file of a snapshot and write it to outputPath. The result is checked against the
+    hash recorded in the manifest before replacing the output.
+
+    :param store: Path to the backup store.
+    :param snapshotId: Id of the snapshot (see backupFile/listBackups).
+    :param outputPath: Path of the restored file.
+    """
+    with open(os.path.join(store, 'snapshots', snapshotId + '.json'), 'r') as f:
+        manifest = json.load(f)
+    chunks = []
+    for chunkHash, footer in zip(manifest['sectors'], manifest['footers']):
+        with open(os.path.join(store, 'sectors', chunkHash[:2], chunkHash), 'rb') as f:
+            chunks.append(f.read())
+        chunks.append(bytes.fromhex(footer))
+    raw = b''.join(chunks)
+    if hashlib.sha256(raw).hexdigest() != manifest['sha256']:
+        raise ValueError(f"The backup store is corrupted: snapshot '{snapshotId}' does not match its hash")
+    writeFileAtomically(outputPath, raw)
+    logger.info("Snapshot '%s' restored to '%s'", snapshotId, outputPath)
+
+
+##
+# Gen3 character table (english/european glyphs). The bytes that are not in the table are decoded as a space
+GEN3_EOS = 0xFF # Terminator of the strings
+GEN3_CHARSET = {
+    0x00: ' ',  0x01: 'À', 0x02: 'Á', 0x03: 'Â', 0x04: 'Ç', 0x05: 'È', 0x06: 'É', 0x07: 'Ê',
+    0x08: 'Ë',  0x09: 'Ì', 0x0B: 'Î', 0x0C: 'Ï', 0x0D: 'Ò', 0x0E: 'Ó', 0x0F: 'Ô',
+    0x10: 'Œ',  0x11: 'Ù', 0x12: 'Ú', 0x13: 'Û', 0x14: 'Ñ', 0x15: 'ß', 0x16: 'à', 0x17: 'á',
+    0x19: 'ç',  0x1A: 'è', 0x1B: 'é', 0x1C: 'ê', 0x1D: 'ë', 0x1E: 'ì', 0x20: 'î', 0x21: 'ï',
+    0x22: 'ò',  0x23: 'ó', 0x24: 'ô', 0x25: 'œ', 0x26: 'ù', 0x27: 'ú', 0x28: 'û', 0x29: 'ñ',
+    0x2A: 'º',  0x2B: 'ª', 0x2D: '&', 0x2E: '+', 0x35: '=', 0x36: ';',
+    0x51: '¿',  0x52: '¡', 0x5A: 'Í', 0x5B: '%', 0x5C: '(', 0x5D: ')', 0x68: 'â', 0x6F: 'í',
+    0x79: '↑',  0x7A: '↓', 0x7B: '←', 0x7C: '→', 0x85: '<', 0x86: '>',
+    0xAB: '!',  0xAC: '?', 0xAD: '.', 0xAE: '-', 0xAF: '・', 0xB0: '…', 0xB1: '“', 0xB2: '”',
+    0xB3: '‘',  0xB4: '’', 0xB5: '♂', 0xB6: '♀', 0xB7: '$', 0xB8: ',', 0xB9: '×', 0xBA: '/',
+    0xEF: '►',  0xF0: ':', 0xF1: 'Ä', 0xF2: 'Ö', 0xF3: 'Ü', 0xF4: 'ä', 0xF5: 'ö', 0xF6: 'ü',
+    0xFE: '\n',
+}
+GEN3_CHARSET.update({0xA1 + i: chr(ord('0') + i) for i in range(10)})
+GEN3_CHARSET.update({0xBB + i: chr(ord('A') + i) for i in range(26)})
+GEN3_CHARSET.update({0xD5 + i: chr(ord('a') + i) for i in range(26)})
+
+# The decoding table is a string of 256 characters indexed by the byte (see codecs.charmap_decode).
+# The terminator is decoded to NUL, a code point that no other byte produces
+GEN3_DECODE_TABLE = ''.join('\0' if i == GEN3_EOS else GEN3_CHARSET.get(i, ' ') for i in range(256))
+GEN3_ENCODE_TABLE = str.maketrans({c: chr(i) for i, c in GEN3_CHARSET.items()} | {"'": chr(0xB4), '"': chr(0xB2)})
 
 
 def decodeString(text):
     """
-    Pokemon strings are not coded in ASCII/UTF-8. They use their own encoding. 
-    I found a previous project in Github (https://github.com/ads04r/Gen3Save.git).
-    It does not always work properly, it should be reviewed, but no modification is being
-    applied over the strings, so it was only used for debugging purposes
+    Pokemon strings are not coded in ASCII/UTF-8. They use their own encoding (see GEN3_CHARSET).
+    The string ends at the first terminator (0xFF) or at the end of the buffer.
 
     :param text: Pokemon-style encoded string
-    :return: An ASCII text representation
-    """
-    chars = "0123456789!?.-         ,  ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-    ret = ""
-    for i in text:
-        c = int(i) - 161
-        if c<0 or c>len(chars):
-            ret = ret + " "
-        else:
-            ret = ret + chars[c]
-    return ret.strip()
+    :return: The decoded text
+    """
+    return codecs.charmap_decode(bytes(text), 'strict', GEN3_DECODE_TABLE)[0].partition('\0')[0]
+
+
+def encodeString(text, length=None):
+    """
+    The complementary operation to decodeString.
+
+    :param text: Text to encode. ValueError is raised if any character has no Gen3 representation.
+    :param length: Optional size of the field. The string is padded with terminators up to it
+                   (a string that fills the whole field has no terminator).
+    :return: A bytes object with the Pokemon-style encoded string
+    """
+    if any(ord(c) not in GEN3_ENCODE_TABLE for c in set(text)):
+        raise ValueError(f"'{text}' contains characters without a Gen3 representation")
+    encoded = text.translate(GEN3_ENCODE_TABLE).encode('latin-1')
+    if length is not None:
+        if len(encoded) > length:
+            raise ValueError(f"'{text}' does not fit in {length} characters")
+        encoded += bytes([GEN3_EOS]) * (length - len(encoded))
+    return encoded
+
+
+def decodeStorageNames(dataPkmnStor):
+    """
+    Decode the nickname and the OT name of the occupied slots of the PC (the data of SLOT1_PKMNSTORAGE).
+    The 17 bytes of the names of every occupied slot are gathered and decoded at once, so the cost per
+    name is a couple of slices.
+
+    :param dataPkmnStor: The PKMNSTORAGE data.
+    :return: A dict {slot (starting at 0): (nickname, OT name)}. The empty slots are not included.
+    """
+    view = memoryview(dataPkmnStor)
+    slots = []
+    chunks = []
+    for i in range(TOTAL_BOXES*PKMN_PER_BOX):
+        offset = FIRSTPKMN_IN_BOX_OFFSET + i*PKMNBOX_STRUCT_SIZE
+        otId = struct.unpack_from('<I', view, offset + 4)[0]
+        if otId != 0 and otId != 0xFFFFFFFF: # Same test as in processObjects
+            slots.append(i)
+            chunks.append(view[offset+8:offset+18])
+            chunks.append(view[offset+20:offset+27])
+    text = codecs.charmap_decode(b''.join(chunks), 'strict', GEN3_DECODE_TABLE)[0]
+    return {slot: (text[k*17:k*17+10].partition('\0')[0], text[k*17+10:k*17+17].partition('\0')[0])
+            for k, slot in enumerate(slots)}
 
 def calculateChecksum(data, size):
     """
@@ -219,8 +486,176 @@ def getSectorDesc(id):
     else: return "UNKNOWN"
 
 
+def getSectorBlock(descr):
+    """
+        Given the description of a saved sector (output of getSectorDesc), return the block where its
+        data is merged and the position of the sector within such block.
+
+        :param descr: Human readable description of the sector.
+        :return: A tuple (block, pos). The block is None for the sectors that are not rebuilt.
+    """
+    if   descr == "SLOT1_SAVEBLOCK1[0]":  return 'SLOT1_SAVEBLOCK1', 0
+    elif descr == "SLOT1_SAVEBLOCK1[1]":  return 'SLOT1_SAVEBLOCK1', 1
+    elif descr == "SLOT1_SAVEBLOCK1[2]":  return 'SLOT1_SAVEBLOCK1', 2
+    elif descr == "SLOT1_SAVEBLOCK1[3]":  return 'SLOT1_SAVEBLOCK1', 3
+    elif descr == "SLOT1_SAVEBLOCK2":     return 'SLOT1_SAVEBLOCK2', 0
+    elif descr == "SLOT1_PKMNSTORAGE[0]": return 'SLOT1_PKMNSTORAGE', 0
+    elif descr == "SLOT1_PKMNSTORAGE[1]": return 'SLOT1_PKMNSTORAGE', 1
+    elif descr == "SLOT1_PKMNSTORAGE[2]": return 'SLOT1_PKMNSTORAGE', 2
+    elif descr == "SLOT1_PKMNSTORAGE[3]": return 'SLOT1_PKMNSTORAGE', 3
+    elif descr == "SLOT1_PKMNSTORAGE[4]": return 'SLOT1_PKMNSTORAGE', 4
+    elif descr == "SLOT1_PKMNSTORAGE[5]": return 'SLOT1_PKMNSTORAGE', 5
+    elif descr == "SLOT1_PKMNSTORAGE[6]": return 'SLOT1_PKMNSTORAGE', 6
+    elif descr == "SLOT1_PKMNSTORAGE[7]": return 'SLOT1_PKMNSTORAGE', 7
+    elif descr == "SLOT1_PKMNSTORAGE[8]": return 'SLOT1_PKMNSTORAGE', 8
+    elif descr == "HOF[0]":               return 'HOF', 0
+    elif descr == "HOF[1]":               return 'HOF', 1
+    elif descr == "TRAINERHILL":          return 'TRAINERHILL', 0
+    elif descr == "RECORDEDBATTLE":       return 'RECORDEDBATTLE', 0
+    else: return None, 0
+
+
+def getBlockPositions(block, offset, size):
+    """
+        Return the (block, pos) pairs of the sectors that hold the bytes [offset, offset+size) of a block.
+        The globals must have been configured with prepareGlobalsForVersion.
+    """
+    return {(block, pos) for pos in range(offset // SECTOR_DATA_SIZE, (offset + size - 1) // SECTOR_DATA_SIZE + 1)}
+
+
+def getFieldsBlocks(fields):
+    """
+        Given a list of sections (see SAVE_FIELDS and EXTRA_FIELDS), return the (block, pos) pairs of the sectors that
+        must be read to decode them. The sector holding the version of the save is always included.
+
+        :param fields: Iterable with the requested sections.
+        :return: A set of (block, pos) tuples.
+    """
+    blocks = getBlockPositions('SLOT1_SAVEBLOCK1', ROGUESAVEVERSION_OFFSET, 2)
+    if 'trainer' in fields or 'items' in fields:
+        # Name, gender, trainer id, played time and the encryption key
+        blocks |= getBlockPositions('SLOT1_SAVEBLOCK2', 0, ENCRIPTIONKEY_OFFSET + 4)
+    if 'trainer' in fields:
+        blocks |= getBlockPositions('SLOT1_SAVEBLOCK1', MONEY_OFFSET, 4)
+    if 'party' in fields:
+        blocks |= getBlockPositions('SLOT1_SAVEBLOCK1', PLAYERPARTY_COUNTOFFSET, FIRSTPKMN_OFFSET - PLAYERPARTY_COUNTOFFSET + PARTY_SIZE*PKMN_STRUCT_SIZE)
+    if 'items' in fields:
+        blocks |= getBlockPositions('SLOT1_SAVEBLOCK1', ITEMS_OFFSET, BAG_ITEM_CAPACITY*4)
+    if 'boxes' in fields:
+        blocks |= getBlockPositions('SLOT1_PKMNSTORAGE', FIRSTPKMN_IN_BOX_OFFSET, TOTAL_BOXES*PKMN_PER_BOX*PKMNBOX_STRUCT_SIZE)
+    if 'dex' in fields:
+        blocks |= getBlockPositions('SLOT1_SAVEBLOCK1', DEXSEEN_OFFSET, 2*DEXSIZE)
+    if 'hof' in fields:
+        blocks |= getBlockPositions('HOF', 0, HALL_OF_FAME_MAX_TEAMS*PARTY_SIZE*HOF_MON_STRUCT.size)
+    return blocks
+
+
+def openSavSource(source):
+    """
+    Open a .sav file for reading. The file can be given as a path, as its content (bytes) or as a
+    seekable file object (which is not closed).
+
+    :return: A context manager with the file object.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, 'read'):
+        source.seek(0)
+        return contextlib.nullcontext(source)
+    return open(source, 'rb')
+
+
+def isSavSector(sector):
+    """
+    Check if the first sector of a file looks like the one of a .sav: a known id and either the
+    signature of the game or an erased footer.
+    """
+    if len(sector) != SECTOR_SIZE:
+        return False
+    id_, _, security, _ = SECTOR_FOOTER_STRUCT.unpack_from(sector, SECTOR_SIZE - SECTOR_FOOTER_STRUCT.size)
+    return (id_ < NSECTORS or id_ == 0xFFFF) and security in (SECTOR_SIGNATURE, 0xFFFFFFFF)
+
+
+def isArchive(path):
+    """
+    Check (by its extension) if the path is a zip/tar archive
+    """
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def readArchiveMember(member, size):
+    """
+    Read a member of an archive if it is a .sav. The size is checked first and then the first sector,
+    so the rest of the non-save members is never read.
+
+    :param member: File object of the member.
+    :param size: Size of the member according to the archive.
+    :return: The content of the member, or None if it is not a .sav.
+    """
+    if size < SAV_MIN_SIZE or size > SAV_MAX_SIZE:
+        return None
+    sector = member.read(SECTOR_SIZE)
+    if not isSavSector(sector):
+        return None
+    return sector + member.read(size - SECTOR_SIZE)
+
 
-def processSavedSector(inputPath):
+def isSavFile(path):
+    """
+    Check if a file looks like a .sav, as the members of the archives (see readArchiveMember):
+    its size first and then its first sector.
+    """
+    size = os.path.getsize(path)
+    if size < SAV_MIN_SIZE or size > SAV_MAX_SIZE:
+        return False
+    with open(path, 'rb') as f:
+        return isSavSector(f.read(SECTOR_SIZE))
+
+
+def iterSavInputs(path):
+    """
+    Iterate over the .sav files of a path. An archive (see ARCHIVE_EXTENSIONS) is read in memory, member by
+    member, without extracting it; any other path is returned as is.
+
+    A folder is walked recursively: its .sav files and archives are included.
+
+    The .sav files of a folder or an archive that are not valid (see isSavFile and readArchiveMember) are
+    returned with None as source, so the callers can count them. The other members of the archives are skipped.
+
+    :param path: Path to a .sav file, to a zip/tar archive or to a folder.
+    :return: A generator of tuples (name, source), where source can be given to processSavFile (or None).
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != BACKUP_STORE_DIR)
+            for name in sorted(files):
+                filePath = os.path.join(root, name)
+                if name.lower().endswith(ARCHIVE_EXTENSIONS):
+                    yield from iterSavInputs(filePath)
+                elif name.lower().endswith('.sav'):
+                    yield filePath, (filePath if isSavFile(filePath) else None)
+    elif not isArchive(path):
+        yield path, path
+    elif path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    data = readArchiveMember(member, info.file_size)
+                if data is not None or info.filename.lower().endswith('.sav'):
+                    yield f"{path}:{info.filename}", data
+    else:
+        with tarfile.open(path, 'r:*') as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                data = readArchiveMember(archive.extractfile(info), info.size)
+                if data is not None or info.name.lower().endswith('.sav'):
+                    yield f"{path}:{info.name}", data
+
+
+def processSavedSector(inputPath, blocks=None):
     """
     The information in the main memory of the device is stored in the following way:
 
@@ -239,73 +674,177 @@ def processSavedSector(inputPath):
     Example: Let's say that the structure PKMNSTORAGE was splitted among 9 blocks. This routine will
     recover the information in a big merged chunk.
 
+    If only some sectors are needed (see getFieldsBlocks), the footers are read first and the data of
+    the rest of the sectors is never read. Their blocks are left filled with zeros.
 
-        
-        
-    :param inputPath: input .sav file
+    :param inputPath: input .sav file (a path, its content or a file object, see openSavSource)
+    :param blocks: Optional set of (block, pos) tuples to read. None to read every sector.
     :return: A dict structure containing the contiguous data of the different structures (SaveBlock{1,2}, PKMNSTORAGE, etc.).
+             The HOF, TRAINERHILL and RECORDEDBATTLE blocks carry a 'modified' flag (see saveSectors).
     """
     fOffset = 0
     parsedSectors = {
-        'SLOT1_SAVEBLOCK1':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'SLOT1_SAVEBLOCK2':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'SLOT1_PKMNSTORAGE':  {'data': bytearray(9*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'SLOT2_SAVEBLOCK1':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'SLOT2_SAVEBLOCK2':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'SLOT2_PKMNSTORAGE':  {'data': bytearray(9*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'HOF':                {'data': bytearray(2*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'TRAINERHILL':        {'data': bytearray(SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF},
-        'RECORDEDBATTLE':     {'data': bytearray(SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF}
+        'SLOT1_SAVEBLOCK1':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*4},
+        'SLOT1_SAVEBLOCK2':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*4},
+        'SLOT1_PKMNSTORAGE':  {'data': bytearray(9*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*9},
+        'SLOT2_SAVEBLOCK1':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*4},
+        'SLOT2_SAVEBLOCK2':   {'data': bytearray(4*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*4},
+        'SLOT2_PKMNSTORAGE':  {'data': bytearray(9*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*9},
+        'HOF':                {'data': bytearray(2*SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None]*2, 'modified':False},
+        'TRAINERHILL':        {'data': bytearray(SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None], 'modified':False},
+        'RECORDEDBATTLE':     {'data': bytearray(SECTOR_DATA_SIZE), 'counter':0, 'security':0xFFFFFFFF, 'checksums':[None], 'modified':False}
     }
-    with open(inputPath, 'rb') as file:
+    debug = logger.isEnabledFor(logging.DEBUG)
+    with openSavSource(inputPath) as file:
         while True:
             if fOffset>=NSECTORS*SECTOR_SIZE:
                 break
-            # Read a chunk of SECTOR_SIZE bytes
-            sector_data = file.read(SECTOR_SIZE)
-            if not sector_data:
-                break
-            
-            # Unpack the data using the struct
-            sector_data = SAVE_SECTOR_STRUCT.unpack(sector_data)
-            # Extract the fields
-            _, id_, checksum, security, counter = sector_data
-            data = bytearray(sector_data[0])
+            if blocks is None:
+                # Read a chunk of SECTOR_SIZE bytes
+                sector_data = file.read(SECTOR_SIZE)
+                if not sector_data:
+                    break
+
+                # Unpack the data using the struct
+                sector_data = SAVE_SECTOR_STRUCT.unpack(sector_data)
+                # Extract the fields
+                _, id_, checksum, security, counter = sector_data
+                data = bytearray(sector_data[0])
+            else:
+                # Only the footer is read. The data is fetched later if the sector was requested
+                file.seek(fOffset + SECTOR_SIZE - SECTOR_FOOTER_STRUCT.size)
+                footer = file.read(SECTOR_FOOTER_STRUCT.size)
+                if len(footer) < SECTOR_FOOTER_STRUCT.size:
+                    break
+                id_, checksum, security, counter = SECTOR_FOOTER_STRUCT.unpack(footer)
+                data = None
             descr = getSectorDesc(id_)
-            print(f"=== {descr} (Offset: 0x{fOffset:04X}, Id: {id_}, Checksum: 0x{checksum:04X}, Counter: {counter}, Security: 0x{security:08X})")
-            
-            if   descr == "SLOT1_SAVEBLOCK1[0]":  block = 'SLOT1_SAVEBLOCK1'; pos = 0
-            elif descr == "SLOT1_SAVEBLOCK1[1]":  block = 'SLOT1_SAVEBLOCK1'; pos = 1
-            elif descr == "SLOT1_SAVEBLOCK1[2]":  block = 'SLOT1_SAVEBLOCK1'; pos = 2
-            elif descr == "SLOT1_SAVEBLOCK1[3]":  block = 'SLOT1_SAVEBLOCK1'; pos = 3
-            elif descr == "SLOT1_SAVEBLOCK2":     block = 'SLOT1_SAVEBLOCK2'; pos = 0
-            elif descr == "SLOT1_PKMNSTORAGE[0]": block = 'SLOT1_PKMNSTORAGE'; pos = 0
-            elif descr == "SLOT1_PKMNSTORAGE[1]": block = 'SLOT1_PKMNSTORAGE'; pos = 1
-            elif descr == "SLOT1_PKMNSTORAGE[2]": block = 'SLOT1_PKMNSTORAGE'; pos = 2
-            elif descr == "SLOT1_PKMNSTORAGE[3]": block = 'SLOT1_PKMNSTORAGE'; pos = 3
-            elif descr == "SLOT1_PKMNSTORAGE[4]": block = 'SLOT1_PKMNSTORAGE'; pos = 4
-            elif descr == "SLOT1_PKMNSTORAGE[5]": block = 'SLOT1_PKMNSTORAGE'; pos = 5
-            elif descr == "SLOT1_PKMNSTORAGE[6]": block = 'SLOT1_PKMNSTORAGE'; pos = 6
-            elif descr == "SLOT1_PKMNSTORAGE[7]": block = 'SLOT1_PKMNSTORAGE'; pos = 7
-            elif descr == "SLOT1_PKMNSTORAGE[8]": block = 'SLOT1_PKMNSTORAGE'; pos = 8
-            elif descr == "HOF[0]":               block = 'HOF'; pos = 0
-            elif descr == "HOF[1]":               block = 'HOF'; pos = 1
-            elif descr == "TRAINERHILL":          block = 'TRAINERHILL'; pos = 0
-            elif descr == "RECORDEDBATTLE":       block = 'RECORDEDBATTLE'; pos = 0
-            else: block = None
+            if debug:
+                logger.debug("=== %s (Offset: 0x%04X, Id: %d, Checksum: 0x%04X, Counter: %d, Security: 0x%08X)", descr, fOffset, id_, checksum, counter, security)
 
+            block, pos = getSectorBlock(descr)
+            if blocks is not None and (block, pos) not in blocks:
+                block = None
 
             if block and counter >= parsedSectors[block]['counter']:
+                if data is None:
+                    file.seek(fOffset)
+                    data = file.read(SECTOR_DATA_SIZE)
                 parsedSectors[block]['data'][SECTOR_DATA_SIZE*pos:SECTOR_DATA_SIZE*(pos+1)] = data
                 parsedSectors[block]['counter']  = counter
                 parsedSectors[block]['security'] = security
+                parsedSectors[block]['checksums'][pos] = checksum
             fOffset += SECTOR_SIZE
     return parsedSectors
 
 
 
-def __writeSector(data, iden, security, counter, ofile):
-    checksum = calculateChecksum(data, SECTOR_DATA_SIZE)
+def readAt(file, offset, size):
+    """
+    Read size bytes at the given offset of a file. os.pread is used when it is available, so the
+    position of the file is not involved.
+    """
+    if hasattr(os, 'pread'):
+        try:
+            return os.pread(file.fileno(), size, offset)
+        except (AttributeError, io.UnsupportedOperation):
+            pass
+    file.seek(offset)
+    return file.read(size)
+
+
+def readSectorMap(file):
+    """
+    Read only the footers of the sectors of a .sav and locate the newest copy of every sector.
+
+    :param file: A .sav file opened for reading (see openSavSource).
+    :return: A dict {(block, pos): (physical offset of the sector, counter)} (see getSectorBlock).
+    """
+    sectorMap = {}
+    for i in range(NSECTORS):
+        footer = readAt(file, (i+1)*SECTOR_SIZE - SECTOR_FOOTER_STRUCT.size, SECTOR_FOOTER_STRUCT.size)
+        if len(footer) < SECTOR_FOOTER_STRUCT.size:
+            break
+        id_, _, _, counter = SECTOR_FOOTER_STRUCT.unpack(footer)
+        block, pos = getSectorBlock(getSectorDesc(id_))
+        if block and ((block, pos) not in sectorMap or counter >= sectorMap[(block, pos)][1]):
+            sectorMap[(block, pos)] = (i*SECTOR_SIZE, counter)
+    return sectorMap
+
+
+def iterBlockRanges(sectorMap, block, offset, size):
+    """
+    Translate the bytes [offset, offset+size) of a block to the physical ranges of the .sav that hold them.
+    A range of bytes may straddle several sectors, which are not contiguous in the file.
+    The globals must have been configured with prepareGlobalsForVersion.
+
+    :param sectorMap: Output of readSectorMap.
+    :return: A generator of tuples (physical offset, length). The offset is None if the sector is not in the file.
+    """
+    while size > 0:
+        pos, inner = divmod(offset, SECTOR_DATA_SIZE)
+        length = min(size, SECTOR_DATA_SIZE - inner)
+        entry = sectorMap.get((block, pos))
+        yield (entry[0] + inner if entry else None), length
+        offset += length
+        size -= length
+
+
+def readBlockRange(file, sectorMap, block, offset, size):
+    """
+    Read the bytes [offset, offset+size) of a block without rebuilding it (see iterBlockRanges).
+    The bytes of the sectors that are not in the file are read as zeros, as in processSavedSector.
+    """
+    return b''.join(readAt(file, physical, length) if physical is not None else bytes(length)
+                    for physical, length in iterBlockRanges(sectorMap, block, offset, size))
+
+
+def prepareGlobalsForFile(file, sectorMap):
+    """
+    Detect the version of a .sav from its sector map and configure the globals for it.
+    The version is read from the first sector of SAVEBLOCK1, which is in the same place for both versions.
+
+    :return: The version (1 for 1.3.2; 2 for 2.0)
+    """
+    rogue13version = struct.unpack('<H', readBlockRange(file, sectorMap, 'SLOT1_SAVEBLOCK1', ROGUESAVEVERSION_OFFSET, 2))[0]
+    version = 1 if rogue13version == 4 else 2
+    prepareGlobalsForVersion(version)
+    return version
+
+
+def readMon(savfile, box, pos):
+    """
+    Random-access read of a single mon. Only the footers of the sectors, the version and the bytes of
+    the mon are read, from the one or two sectors that hold it.
+
+    :param savfile: Path to the .sav file (or its content, see openSavSource).
+    :param box: 0 for the party; 1 to TOTAL_BOXES for the PC boxes.
+    :param pos: Position of the mon, starting at 1.
+    :return: A dict {data, box, pos} as the ones of objs['pkmns'] (see processObjects), or None if the slot is empty.
+    """
+    with openSavSource(savfile) as file:
+        sectorMap = readSectorMap(file)
+        version = prepareGlobalsForFile(file, sectorMap)
+        if box == 0:
+            if not 1 <= pos <= PARTY_SIZE:
+                raise ValueError(f"The position in the party must be between 1 and {PARTY_SIZE}")
+            if pos > readBlockRange(file, sectorMap, 'SLOT1_SAVEBLOCK1', PLAYERPARTY_COUNTOFFSET, 1)[0]:
+                return None
+            raw = readBlockRange(file, sectorMap, 'SLOT1_SAVEBLOCK1', FIRSTPKMN_OFFSET + (pos-1)*PKMN_STRUCT_SIZE, PKMN_STRUCT_SIZE)
+        else:
+            if not 1 <= box <= TOTAL_BOXES or not 1 <= pos <= PKMN_PER_BOX:
+                raise ValueError(f"The box must be between 1 and {TOTAL_BOXES} and the position between 1 and {PKMN_PER_BOX}")
+            offset = FIRSTPKMN_IN_BOX_OFFSET + ((box-1)*PKMN_PER_BOX + pos-1)*PKMNBOX_STRUCT_SIZE
+            raw = readBlockRange(file, sectorMap, 'SLOT1_PKMNSTORAGE', offset, PKMNBOX_STRUCT_SIZE)
+            otId = struct.unpack('<I', raw[4:8])[0]
+            if otId == 0 or otId == 0xFFFFFFFF:
+                return None
+    return {'data': createMon(bytearray(raw), version), 'box': box, 'pos': pos}
+
+
+def __writeSector(data, iden, security, counter, ofile, checksum=None):
+    if checksum is None:
+        checksum = calculateChecksum(data, SECTOR_DATA_SIZE)
     new_sector_data = SAVE_SECTOR_STRUCT.pack(data,iden,checksum,security,counter)
     ofile.write(new_sector_data)
 
@@ -313,6 +852,9 @@ def __writeSector(data, iden, security, counter, ofile):
 def saveSectors(sectors, outputPath):
     """
     Write the dictionary containing the different information from the sectors to a .sav file
+
+    The HOF, TRAINERHILL and RECORDEDBATTLE blocks are copied with the checksums that were read unless
+    they were flagged as 'modified' (see writeHallOfFame).
     """
     security = sectors['SLOT1_SAVEBLOCK2']['security']
     counter = sectors['SLOT1_SAVEBLOCK2']['counter'] + 1
@@ -320,6 +862,10 @@ def saveSectors(sectors, outputPath):
         counter += 1
     emptyId = 0xFFFF
     invalidSecurity = 0xFFFFFFFF
+    def storedChecksum(block, pos):
+        if sectors[block].get('modified', True):
+            return None
+        return sectors[block]['checksums'][pos]
     with open(outputPath, 'wb') as ofile:
         id_ = 0
         __writeSector(sectors['SLOT1_SAVEBLOCK2']['data'][:SECTOR_DATA_SIZE], id_, security, counter, ofile); id_+=1
@@ -337,18 +883,18 @@ def saveSectors(sectors, outputPath):
         else:
             hofId = id_
         for i in range(2):
-            __writeSector(sectors['HOF']['data'][i*SECTOR_DATA_SIZE:(i+1)*SECTOR_DATA_SIZE], hofId, sectors['HOF']['security'], counter, ofile); id_+=1;
+            __writeSector(sectors['HOF']['data'][i*SECTOR_DATA_SIZE:(i+1)*SECTOR_DATA_SIZE], hofId, sectors['HOF']['security'], counter, ofile, storedChecksum('HOF', i)); id_+=1;
             if hofId!=emptyId: hofId+=1
         if sectors['TRAINERHILL']['security']==invalidSecurity:
             trainId = emptyId
         else:
             trainId = id_
-        __writeSector(sectors['TRAINERHILL']['data'][:SECTOR_DATA_SIZE], trainId, sectors['TRAINERHILL']['security'], counter, ofile); id_+=1
-        if sectors['TRAINERHILL']['security']==invalidSecurity:
+        __writeSector(sectors['TRAINERHILL']['data'][:SECTOR_DATA_SIZE], trainId, sectors['TRAINERHILL']['security'], counter, ofile, storedChecksum('TRAINERHILL', 0)); id_+=1
+        if sectors['RECORDEDBATTLE']['security']==invalidSecurity:
             batId = emptyId
         else:
             batId = id_
-        __writeSector(sectors['RECORDEDBATTLE']['data'][:SECTOR_DATA_SIZE], batId, sectors['RECORDEDBATTLE']['security'], counter, ofile); id_+=1
+        __writeSector(sectors['RECORDEDBATTLE']['data'][:SECTOR_DATA_SIZE], batId, sectors['RECORDEDBATTLE']['security'], counter, ofile, storedChecksum('RECORDEDBATTLE', 0)); id_+=1
     return
 
 
@@ -359,14 +905,21 @@ def saveSectors(sectors, outputPath):
 
 ###
 # 1. Mon routines
-def printMon(pkmDict):
+def formatMon(pkmDict):
     """
-    Print a mon to the standard output
+    Return the line that describes a mon in the reports
     """
     if pkmDict['box'] == 0:
-        print(f"     < PARTY  N{pkmDict['pos']:02} > Pokemon #{pkmDict['data']['nPkmn']} named '{pkmDict['data']['pkmnName']}'  (Shiny: {pkmDict['data']['shiny']})")
+        return f"     < PARTY  N{pkmDict['pos']:02} > Pokemon #{pkmDict['data']['nPkmn']} named '{pkmDict['data']['pkmnName']}'  (Shiny: {pkmDict['data']['shiny']})"
     else:
-        print(f"     < BOX {pkmDict['box']:02} N{pkmDict['pos']:02} > Pokemon #{pkmDict['data']['nPkmn']} named '{pkmDict['data']['pkmnName']}'  (Shiny: {pkmDict['data']['shiny']})")
+        return f"     < BOX {pkmDict['box']:02} N{pkmDict['pos']:02} > Pokemon #{pkmDict['data']['nPkmn']} named '{pkmDict['data']['pkmnName']}'  (Shiny: {pkmDict['data']['shiny']})"
+
+
+def printMon(pkmDict):
+    """
+    Print a mon to the standard output
+    """
+    sys.stdout.write(formatMon(pkmDict) + "\n")
 
 
 def getTypes(rawData, personality):
@@ -456,16 +1009,19 @@ def decryptTypes(rawType, key):
         rawType[i*4:(i+1)*4] = struct.pack('<I', xor(key, w))
     return rawType
 
-def createMon(ba, version):
+def createMon(ba, version, names=None):
     """
     From a byte array representing a mon, and the version of such bytearray (1 for 1.3.2; 2 for 2.0 .sav file)
     return a dictionary with the different characteristics. 
+
+    The names (nickname, OT name) can be given if they were already decoded (see decodeStorageNames).
     """
     pkm = ba
+    raw = bytes(pkm[:PKMNBOX_STRUCT_SIZE])
     personality = struct.unpack('<I', pkm[0:4])[0]
     trainerId   = struct.unpack('<I', pkm[4:8])[0]
     cPkmnName   = pkm[8:18]
-    pkmnName    = decodeString(cPkmnName)
+    pkmnName    = names[0] if names else decodeString(cPkmnName)
     lang        = pkm[18]
     if version == 2:
         hiddenNatureModifier = lang>>3
@@ -474,7 +1030,7 @@ def createMon(ba, version):
         hiddenNatureModifier = 0
     EggSpecies  = pkm[19]
     cTrainerName = pkm[20:27]
-    trainerName = decodeString(cTrainerName)
+    trainerName = names[1] if names else decodeString(cTrainerName)
     markings    = pkm[27]
     checksum    = struct.unpack('<H', pkm[28:30])[0]
     unknown    = struct.unpack('<H', pkm[30:32])[0]
@@ -526,9 +1082,19 @@ def createMon(ba, version):
         'type2': type2,
         'type3': type3,
         'key': key,
+        'raw': raw,
     }
     return d
 
+def speciesToVersion2(species):
+    """
+    Translate a species of a 1.3.2 .sav to the 2.0 numbering. The species after NPOKEMON_V1 were shifted.
+    """
+    if species > NPOKEMON_V1:
+        species += NPOKEMON_V2-NPOKEMON_V1
+    return species
+
+
 def serializeMon(mon, version, newOtId=None):
     """
     Given a pokemon representation, return the associated bytearray for the version
@@ -549,9 +1115,7 @@ def serializeMon(mon, version, newOtId=None):
 
     if version == 2 and mon['version']==1:
         # The type0 and type3 (shiny) struct has been modified with the latest update
-        species     = struct.unpack('<H', mon['type0'][0:2])[0]
-        if species > NPOKEMON_V1:
-            species += NPOKEMON_V2-NPOKEMON_V1
+        species     = speciesToVersion2(struct.unpack('<H', mon['type0'][0:2])[0])
         # heldItem    = struct.unpack('<H', mon['type0'][2:4])[0]
         heldItem    = 0 # The item id does not match between 1.3.2 and 2.0
         experience  = struct.unpack('<I', mon['type0'][4:8])[0]
@@ -571,6 +1135,104 @@ def serializeMon(mon, version, newOtId=None):
     return ba
 
 
+def xorKeystream(data, keys):
+    """
+    XOR the substructures (bytes 32 to 80) of consecutive PokemonBox records with their keys, all the records
+    at once (the data is handled as a single big integer). The headers are not modified.
+
+    :param data: The records, back to back.
+    :param keys: The key of each record.
+    :return: A bytearray with the result
+    """
+    stream = b''.join(bytes(32) + struct.pack('<I', key)*12 for key in keys)
+    return bytearray((int.from_bytes(data, 'little') ^ int.from_bytes(stream, 'little')).to_bytes(len(data), 'little'))
+
+
+def upgradeMonsToVersion2(records, newOtId):
+    """
+    Batch version of serializeMon(createMon(record, 1), 2, newOtId) for many 1.3.2 mons; the output is the same.
+    The species are remapped, the held items removed and the shiny flag set in type3. The records are decrypted,
+    checksummed and encrypted again all at once. The personality does not change, so neither does the order
+    of the substructures.
+
+    :param records: The PokemonBox records of 1.3.2 mons, back to back (e.g. the boxes of SLOT1_PKMNSTORAGE).
+    :param newOtId: Trainer id of the 2.0 .sav that receives the mons.
+    :return: A bytearray with the records for the 2.0 version
+    """
+    count = len(records) // PKMNBOX_STRUCT_SIZE
+    headers = [struct.unpack_from('<II', records, i*PKMNBOX_STRUCT_SIZE) for i in range(count)]
+    data = xorKeystream(bytes(records[:count*PKMNBOX_STRUCT_SIZE]), [personality ^ otId for personality, otId in headers])
+    for i, (personality, otId) in enumerate(headers):
+        offset = i*PKMNBOX_STRUCT_SIZE
+        positions = SUBSTRUCT_POSITIONS[personality % 24]
+        type0 = offset + 32 + positions[0]*12
+        species = speciesToVersion2(struct.unpack_from('<H', data, type0)[0])
+        struct.pack_into('<I', data, type0, species & 0x7ff) # The held item is removed (see serializeMon)
+        if ((otId >> 16) ^ (otId & 0xFFFF) ^ (personality >> 16) ^ (personality & 0xFFFF)) < SHINY_ODDS: # as in createMon
+            data[offset + 32 + positions[3]*12 + 8] |= 1
+        struct.pack_into('<I', data, offset + 4, newOtId)
+    words = array.array('H', data)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    for i in range(count):
+        start = i*PKMNBOX_STRUCT_SIZE // 2
+        struct.pack_into('<H', data, i*PKMNBOX_STRUCT_SIZE + 28, sum(words[start+16:start+40]) & 0xFFFF)
+    return xorKeystream(data, [personality ^ newOtId for personality, _ in headers])
+
+
+def upgradeStorageToVersion2(dataPkmnStor, newOtId):
+    """
+    Upgrade in place the mons of the PC boxes of a 1.3.2 SLOT1_PKMNSTORAGE block (see upgradeMonsToVersion2).
+    The empty slots are not modified.
+
+    :return: The number of mons upgraded
+    """
+    size = TOTAL_BOXES*PKMN_PER_BOX*PKMNBOX_STRUCT_SIZE
+    boxes = memoryview(dataPkmnStor)[FIRSTPKMN_IN_BOX_OFFSET:FIRSTPKMN_IN_BOX_OFFSET+size]
+    offsets = [offset for offset in range(0, size, PKMNBOX_STRUCT_SIZE)
+               if struct.unpack_from('<I', boxes, offset+4)[0] not in (0, 0xFFFFFFFF)]
+    upgraded = upgradeMonsToVersion2(b''.join(boxes[offset:offset+PKMNBOX_STRUCT_SIZE] for offset in offsets), newOtId)
+    for i, offset in enumerate(offsets):
+        boxes[offset:offset+PKMNBOX_STRUCT_SIZE] = upgraded[i*PKMNBOX_STRUCT_SIZE:(i+1)*PKMNBOX_STRUCT_SIZE]
+    return len(offsets)
+
+
+def peekSpecies(record):
+    """
+    Return the species of an encrypted PokemonBox without decrypting the whole record: only the first word
+    of the substructure type0 is decrypted. It is a cheap alternative to createMon(...)['nPkmn'].
+    """
+    personality, otId = struct.unpack_from('<II', record, 0)
+    offset = 32 + SUBSTRUCT_POSITIONS[personality % 24][0]*12
+    return xor(struct.unpack_from('<I', record, offset)[0], personality ^ otId) & 0x7ff
+
+
+def reorderBoxes(dataPkmnStor, sort=False):
+    """
+    Move the mons of the PC boxes to the first slots, so there are no gaps between them, and optionally sort
+    them by species (the order of the mons of the same species is kept). The encryption of a PokemonBox does
+    not depend on its slot, so the records are moved as they are, without decoding them.
+
+    :param dataPkmnStor: The data of the block SLOT1_PKMNSTORAGE. It is modified in place.
+    :param sort: Sort the mons by species.
+    :return: The new order: a list with the slot (starting at 0) where each mon was, in the order they are now
+    """
+    size = TOTAL_BOXES*PKMN_PER_BOX*PKMNBOX_STRUCT_SIZE
+    boxes = memoryview(dataPkmnStor)[FIRSTPKMN_IN_BOX_OFFSET:FIRSTPKMN_IN_BOX_OFFSET+size]
+    records = []
+    for slot in range(TOTAL_BOXES*PKMN_PER_BOX):
+        record = boxes[slot*PKMNBOX_STRUCT_SIZE:(slot+1)*PKMNBOX_STRUCT_SIZE]
+        otId = struct.unpack_from('<I', record, 4)[0]
+        if otId != 0 and otId != 0xFFFFFFFF: # Same test as in processObjects
+            records.append((slot, record))
+    if sort:
+        records.sort(key=lambda item: peekSpecies(item[1]))
+    packed = b''.join(record for _, record in records)
+    boxes[:len(packed)] = packed
+    boxes[len(packed):] = bytes(size - len(packed))
+    return [slot for slot, _ in records]
+
+
 ###
 # 2. Pokedex routines
 def pokedexBitmaskToData(bmSeen, bmCaught, version):
@@ -646,6 +1308,16 @@ def pokedexDataToBitmask(pokedex, pokemons, baSeen, baCaught, version):
 
 ###
 # 3. Item routines
+def itemIdToVersion2(itemId):
+    """
+    Translate the id of an item of a 1.3.2 .sav to the 2.0 numbering. 11 items were added after the balls.
+    """
+    LAST_BALL_V1 = 27
+    if itemId > LAST_BALL_V1:
+        itemId += 11
+    return itemId
+
+
 def bagItemsToVersion2(il):
     """
     Given a list of objects (array of dicts in the form {id, quantity}), return a filtered list
@@ -678,8 +1350,7 @@ def bagItemsToVersion2(il):
     LAST_TMHM_V1  = 689
 
     for el in il:
-        if el['id']>LAST_BALL_V1:
-            el['id']+=11
+        el['id'] = itemIdToVersion2(el['id'])
     sorted_array = sorted(il, key=lambda x: x['id'])
     filtered_array = []
     # Items pocket
@@ -693,10 +1364,140 @@ def bagItemsToVersion2(il):
 
 
 
+###
+# 4. Hall of Fame, Trainer Hill and Recorded Battle routines
+#
+# These blocks are only decoded on demand. The readers walk a memoryview of the block with
+# struct.iter_unpack, so the records are produced one by one and the block is never copied.
+def iterHallOfFame(sectors):
+    """
+    Iterate over the teams stored in the Hall of Fame (struct HallofFameTeam). The iteration stops
+    at the first empty team.
+
+    :param sectors: Output of processSavedSector.
+    :return: A generator of teams. Each team is a list with a dict per mon
+             {trainerId, personality, nPkmn, shiny, level, pkmnName, cPkmnName}.
+    """
+    view = memoryview(sectors['HOF']['data'])[:HALL_OF_FAME_MAX_TEAMS*PARTY_SIZE*HOF_MON_STRUCT.size]
+    team = []
+    for trainerId, personality, speciesShiny, level, cPkmnName in HOF_MON_STRUCT.iter_unpack(view):
+        if not team and speciesShiny == 0:
+            return
+        if speciesShiny != 0:
+            team.append({
+                'trainerId':   trainerId,
+                'personality': personality,
+                'nPkmn':       speciesShiny >> 1,
+                'shiny':       bool(speciesShiny & 0x1),
+                'level':       level,
+                'pkmnName':    decodeString(cPkmnName),
+                'cPkmnName':   cPkmnName,
+            })
+        else:
+            team.append(None)
+        if len(team) == PARTY_SIZE:
+            yield [mon for mon in team if mon]
+            team = []
+
+
+def writeHallOfFame(sectors, teams):
+    """
+    Replace the teams of the Hall of Fame. The block is flagged as modified, so saveSectors computes
+    its checksums again.
+
+    :param sectors: Output of processSavedSector.
+    :param teams: A list of teams in the format returned by iterHallOfFame. If a mon has no 'cPkmnName',
+                  its 'pkmnName' is encoded.
+    """
+    if len(teams) > HALL_OF_FAME_MAX_TEAMS:
+        raise ValueError(f"The Hall of Fame can not store more than {HALL_OF_FAME_MAX_TEAMS} teams")
+    data = sectors['HOF']['data']
+    data[:HALL_OF_FAME_MAX_TEAMS*PARTY_SIZE*HOF_MON_STRUCT.size] = bytes(HALL_OF_FAME_MAX_TEAMS*PARTY_SIZE*HOF_MON_STRUCT.size)
+    for i, team in enumerate(teams):
+        for j, mon in enumerate(team[:PARTY_SIZE]):
+            cPkmnName = mon.get('cPkmnName') or encodeString(mon['pkmnName'], 10)
+            HOF_MON_STRUCT.pack_into(data, (i*PARTY_SIZE+j)*HOF_MON_STRUCT.size,
+                mon['trainerId'], mon['personality'], (mon['nPkmn'] << 1) | int(mon['shiny']), mon['level'], bytes(cPkmnName))
+    sectors['HOF']['modified'] = True
+    if sectors['HOF']['security'] == 0xFFFFFFFF: # The block was empty, so the sectors did not have an id
+        sectors['HOF']['security'] = sectors['SLOT1_SAVEBLOCK2']['security']
+
+
+def readTrainerHill(sectors):
+    """
+    Read the header of the Trainer Hill challenge (struct TrainerHillChallenge) loaded in the save.
+
+    :param sectors: Output of processSavedSector.
+    :return: None if the block was never written. Otherwise a dict {numTrainers, numFloors, checksum, data},
+             where data is a memoryview over the floors that follow the header.
+    """
+    if sectors['TRAINERHILL']['security'] == 0xFFFFFFFF:
+        return None
+    view = memoryview(sectors['TRAINERHILL']['data'])
+    numTrainers, numFloors, checksum = TRAINER_HILL_HEADER_STRUCT.unpack_from(view)
+    return {
+        'numTrainers': numTrainers,
+        'numFloors':   numFloors,
+        'checksum':    checksum,
+        'data':        view[TRAINER_HILL_HEADER_STRUCT.size:],
+    }
+
+
+def readRecordedBattle(sectors, version):
+    """
+    Read the battle recorded at the Battle Frontier (struct RecordedBattleSave).
+    The parties are decoded lazily: they are generators of dicts in the format of createMon.
+
+    :param sectors: Output of processSavedSector.
+    :param version: Version of the .sav (objs['version'], see processObjects). The globals are configured for it.
+    :return: None if the block was never written. Otherwise a dict {players, rngSeed, battleFlags, playerParty, opponentParty}.
+    """
+    if sectors['RECORDEDBATTLE']['security'] == 0xFFFFFFFF:
+        return None
+    prepareGlobalsForVersion(version)
+    pkmnSize = PKMN_STRUCT_SIZE # The parties are decoded later, when the globals may have changed
+    view = memoryview(sectors['RECORDEDBATTLE']['data'])
+    def iterParty(partyView):
+        for (pkm,) in struct.iter_unpack(f'{pkmnSize}s', partyView):
+            if struct.unpack_from('<I', pkm, 4)[0] not in (0, 0xFFFFFFFF): # otId
+                yield createMon(pkm, version)
+    partySize = PARTY_SIZE*pkmnSize
+    names, genders, id0, id1, id2, id3, languages, rngSeed, battleFlags = RECORDED_BATTLE_PLAYERS_STRUCT.unpack_from(view, 2*partySize)
+    players = []
+    for i, trainerId in enumerate((id0, id1, id2, id3)):
+        if trainerId == 0:
+            continue
+        players.append({
+            'name':     decodeString(names[i*(PLAYER_NAME_LENGTH+1):(i+1)*(PLAYER_NAME_LENGTH+1)]),
+            'gender':   genders[i],
+            'id':       trainerId,
+            'language': languages[i],
+        })
+    return {
+        'players':       players,
+        'rngSeed':       rngSeed,
+        'battleFlags':   battleFlags,
+        'playerParty':   iterParty(view[:partySize]),
+        'opponentParty': iterParty(view[partySize:2*partySize]),
+    }
+
+
+def formatHallOfFame(teams):
+    """
+    Return the lines that describe the teams of the Hall of Fame in the reports
+    """
+    lines = [f"   Hall of Fame:   {len(teams)} teams"]
+    for i, team in enumerate(teams):
+        lines.append(f"     < TEAM {i+1:02} > " + ", ".join(f"#{mon['nPkmn']} '{mon['pkmnName']}' Lv.{mon['level']}" + (" (Shiny)" if mon['shiny'] else "") for mon in team))
+    return lines
+
+
+
+
 ##################################
 # Main functions of this project #
 ##################################
-def processObjects(sectors, tamperObject = None):
+def processObjects(sectors, tamperObject = None, fields = None):
     """
     Given the saved sectors of a .sav file (output of the function processSavedSector), 
     return a dict with the basic information.
@@ -725,21 +1526,29 @@ def processObjects(sectors, tamperObject = None):
         minutes
 
     It is not difficult to understand each member (I hope)
+
+    The fields argument restricts the decoding to some sections (see SAVE_FIELDS). Only the members
+    of those sections are returned: trainer -> trainer + stats; party/boxes -> pkmns; items; dex -> pokedex.
+    The Hall of Fame (hof -> hof, see iterHallOfFame) is only decoded if it is requested.
+    The fields are ignored when the sectors are tampered, as all of them are rewritten.
     """
     rogue13version = struct.unpack('<H', sectors['SLOT1_SAVEBLOCK1']['data'][ROGUESAVEVERSION_OFFSET:ROGUESAVEVERSION_OFFSET+2])[0]
     if rogue13version == 4:
         saveFormat = 1 # 1.3.2 and previous versions
-        print("--- Detected a 1.3.2 save format ---")
         if SECTOR_DATA_SIZE != SECTOR_DATA_SIZE_V1:
             return None
+        logger.info("--- Detected a 1.3.2 save format ---")
     else:
         saveFormat = 2
-        print("--- Detected a 2.0 save format ---")
         if SECTOR_DATA_SIZE != SECTOR_DATA_SIZE_V2:
             return None
+        logger.info("--- Detected a 2.0 save format ---")
     if tamperObject:
         tamperObject['lastInsertedItem'] = 0
         tamperObject['lastInsertedPkmn'] = 0
+        fields = None
+    if fields is None:
+        fields = SAVE_FIELDS
     objs = {'version': saveFormat}
     
     encryptionKey = 0
@@ -760,7 +1569,7 @@ def processObjects(sectors, tamperObject = None):
     structOffset+=2
     minutes       = dataSb2[structOffset]; 
     if tamperObject and 'minutes' in tamperObject:
-        hours = tamperObject['minutes']
+        minutes = tamperObject['minutes']
         dataSb2[structOffset] = minutes; 
     structOffset+=1
     encryptionKey = struct.unpack('<I', dataSb2[ENCRIPTIONKEY_OFFSET:ENCRIPTIONKEY_OFFSET + 4])[0]
@@ -769,126 +1578,719 @@ def processObjects(sectors, tamperObject = None):
 
     ##
     # Let's parse -> "SLOT1_SAVEBLOCK1":
-    playerPartyCount = dataSb1[PLAYERPARTY_COUNTOFFSET] # Offset obtained from the spec for emerald rogue (global.h:238)
-    objs['pkmns'] = []
-    for i in range(playerPartyCount):
-        # objs['pkmns'].append(bytearray(dataSb1[FIRSTPKMN_OFFSET+i*PKMN_STRUCT_SIZE:FIRSTPKMN_OFFSET+(i+1)*PKMN_STRUCT_SIZE]))
-        objs['pkmns'].append({
-            'data': createMon(bytearray(dataSb1[FIRSTPKMN_OFFSET+i*PKMN_STRUCT_SIZE:FIRSTPKMN_OFFSET+(i+1)*PKMN_STRUCT_SIZE]), objs['version']),
-            'box': 0,
-            'pos': i+1
-        })
-    for i in range(TOTAL_BOXES):
-        for j in range(PKMN_PER_BOX):
-            offset = FIRSTPKMN_IN_BOX_OFFSET + (i*PKMN_PER_BOX+j)*PKMNBOX_STRUCT_SIZE
-            otId = struct.unpack('<I',dataPkmnStor[offset + 4 : offset + 8])[0]
-            if otId!=0 and otId !=0xFFFFFFFF: # otId!=0. It comes after the personality
-                objs['pkmns'].append({
-                    'data': createMon(bytearray(dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE]), objs['version']),
-                    'box': i+1,
-                    'pos': j+1
-                })
-            elif tamperObject and tamperObject['cloneFirstinParty'] and tamperObject['lastInsertedPkmn'] == 0:
-                objs['pkmns'].append({
-                    'data': objs['pkmns'][0]['data'],
-                    'box': i+1,
-                    'pos': j+1
-                })
-                dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE] = serializeMon(objs['pkmns'][0]['data'], objs['version'], trainerId)
-                tamperObject['cloneFirstinParty']=False
-            elif tamperObject and len(tamperObject['pkmn'])>tamperObject['lastInsertedPkmn']:
-                objs['pkmns'].append({
-                    'data': tamperObject['pkmn'][tamperObject['lastInsertedPkmn']],
-                    'box': i+1,
-                    'pos': j+1
-                })
-                dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE] = serializeMon(tamperObject['pkmn'][tamperObject['lastInsertedPkmn']], objs['version'], trainerId)
-                tamperObject['lastInsertedPkmn']+=1
+    if 'party' in fields or 'boxes' in fields:
+        objs['pkmns'] = []
+    if 'party' in fields:
+        playerPartyCount = dataSb1[PLAYERPARTY_COUNTOFFSET] # Offset obtained from the spec for emerald rogue (global.h:238)
+        for i in range(playerPartyCount):
+            # objs['pkmns'].append(bytearray(dataSb1[FIRSTPKMN_OFFSET+i*PKMN_STRUCT_SIZE:FIRSTPKMN_OFFSET+(i+1)*PKMN_STRUCT_SIZE]))
+            objs['pkmns'].append({
+                'data': createMon(bytearray(dataSb1[FIRSTPKMN_OFFSET+i*PKMN_STRUCT_SIZE:FIRSTPKMN_OFFSET+(i+1)*PKMN_STRUCT_SIZE]), objs['version']),
+                'box': 0,
+                'pos': i+1
+            })
+    if 'boxes' in fields:
+        boxNames = decodeStorageNames(dataPkmnStor)
+        upgraded = None
+        if tamperObject and saveFormat == 2 and tamperObject.get('pkmn') and all(mon['version'] == 1 for mon in tamperObject['pkmn']):
+            # The mons of a 1.3.2 .sav are converted all at once (see upgradeMonsToVersion2)
+            upgraded = upgradeMonsToVersion2(b''.join(mon['raw'] for mon in tamperObject['pkmn']), trainerId)
+        for i in range(TOTAL_BOXES):
+            for j in range(PKMN_PER_BOX):
+                offset = FIRSTPKMN_IN_BOX_OFFSET + (i*PKMN_PER_BOX+j)*PKMNBOX_STRUCT_SIZE
+                otId = struct.unpack('<I',dataPkmnStor[offset + 4 : offset + 8])[0]
+                if otId!=0 and otId !=0xFFFFFFFF: # otId!=0. It comes after the personality
+                    objs['pkmns'].append({
+                        'data': createMon(bytearray(dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE]), objs['version'], boxNames[i*PKMN_PER_BOX+j]),
+                        'box': i+1,
+                        'pos': j+1
+                    })
+                elif tamperObject and tamperObject.get('cloneFirstinParty') and tamperObject['lastInsertedPkmn'] == 0:
+                    objs['pkmns'].append({
+                        'data': objs['pkmns'][0]['data'],
+                        'box': i+1,
+                        'pos': j+1
+                    })
+                    dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE] = serializeMon(objs['pkmns'][0]['data'], objs['version'], trainerId)
+                    tamperObject['cloneFirstinParty']=False
+                elif tamperObject and len(tamperObject.get('pkmn', []))>tamperObject['lastInsertedPkmn']:
+                    objs['pkmns'].append({
+                        'data': tamperObject['pkmn'][tamperObject['lastInsertedPkmn']],
+                        'box': i+1,
+                        'pos': j+1
+                    })
+                    if upgraded:
+                        k = tamperObject['lastInsertedPkmn']
+                        dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE] = upgraded[k*PKMNBOX_STRUCT_SIZE:(k+1)*PKMNBOX_STRUCT_SIZE]
+                    else:
+                        dataPkmnStor[offset : offset+PKMNBOX_STRUCT_SIZE] = serializeMon(tamperObject['pkmn'][tamperObject['lastInsertedPkmn']], objs['version'], trainerId)
+                    tamperObject['lastInsertedPkmn']+=1
     ## tamper -> modify the money
-    if tamperObject and tamperObject['money']>0:
+    if tamperObject and tamperObject.get('money', 0)>0:
         dataSb1[MONEY_OFFSET:MONEY_OFFSET+4] = struct.pack('<I', xor(encryptionKey, tamperObject['money']))
         money = tamperObject['money']
-    objs['items']=[]
-    for i in range(BAG_ITEM_CAPACITY):
-        ## tamper -> items
-        if tamperObject:
-            if tamperObject['lastInsertedItem']<len(tamperObject['items']):
-                dataSb1[ITEMS_OFFSET+i*4:ITEMS_OFFSET+i*4+2]   = struct.pack('<H', tamperObject['items'][tamperObject['lastInsertedItem']]['id'])
-                dataSb1[ITEMS_OFFSET+i*4+2:ITEMS_OFFSET+i*4+4] = struct.pack('<H', xor(encryptionKey, tamperObject['items'][tamperObject['lastInsertedItem']]['quantity'])&0xffff)
-                objs['items'].append({'id':tamperObject['items'][tamperObject['lastInsertedItem']]['id'],'quantity':tamperObject['items'][tamperObject['lastInsertedItem']]['quantity']})
-                tamperObject['lastInsertedItem']+=1
+    if 'items' in fields:
+        objs['items']=[]
+        for i in range(BAG_ITEM_CAPACITY):
+            ## tamper -> items
+            if tamperObject:
+                if tamperObject['lastInsertedItem']<len(tamperObject.get('items', [])):
+                    dataSb1[ITEMS_OFFSET+i*4:ITEMS_OFFSET+i*4+2]   = struct.pack('<H', tamperObject['items'][tamperObject['lastInsertedItem']]['id'])
+                    dataSb1[ITEMS_OFFSET+i*4+2:ITEMS_OFFSET+i*4+4] = struct.pack('<H', xor(encryptionKey, tamperObject['items'][tamperObject['lastInsertedItem']]['quantity'])&0xffff)
+                    objs['items'].append({'id':tamperObject['items'][tamperObject['lastInsertedItem']]['id'],'quantity':tamperObject['items'][tamperObject['lastInsertedItem']]['quantity']})
+                    tamperObject['lastInsertedItem']+=1
+                else:
+                    itemId = 0
+                    itemQuantity = 0
+                    dataSb1[ITEMS_OFFSET+i*4:ITEMS_OFFSET+i*4+2] = struct.pack('<H', itemId)
+                    dataSb1[ITEMS_OFFSET+i*4+2:ITEMS_OFFSET+i*4+4] = struct.pack('<H', itemQuantity)
             else:
-                itemId = 0
-                itemQuantity = 0
-                dataSb1[ITEMS_OFFSET+i*4:ITEMS_OFFSET+i*4+2] = struct.pack('<H', itemId)
-                dataSb1[ITEMS_OFFSET+i*4+2:ITEMS_OFFSET+i*4+4] = struct.pack('<H', itemQuantity)
-        else:
-            itemId = struct.unpack('<H', dataSb1[ITEMS_OFFSET+i*4:ITEMS_OFFSET+i*4+2])[0]
-            itemQuantity = xor(struct.unpack('<H', dataSb1[ITEMS_OFFSET+i*4+2:ITEMS_OFFSET+i*4+4])[0], encryptionKey&0xffff)
-            if itemId!=0:
-                objs['items'].append({'id':itemId,'quantity':itemQuantity})
-    # Tamper the pokedex
-    if tamperObject and tamperObject['fullPokedex']:
-        for i in range(DEXSIZE):
-            dataSb1[DEXSEEN_OFFSET+i]=0xff
-            dataSb1[DEXCAUGHT_OFFSET+i]=0xff
-    if tamperObject and 'pokedex' in tamperObject:
-        if saveFormat==2:
-            dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE], dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE] = pokedexDataToBitmask(
-                tamperObject['pokedex'],
-                objs['pkmns'],
-                dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE],
-                dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE],
-                saveFormat)
-    objs['pokedex'] = pokedexBitmaskToData( dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE], dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE], saveFormat)
-    objs['trainer'] = {
-        'name':decodeString(trainerName),
-        'id':trainerId,
-        'gender':trainerGender
-    }
-    objs['stats'] = {
-        'hours':hours,
-        'minutes':minutes,
-        'money':money,
-    }
-    objs['key'] = encryptionKey
+                itemId = struct.unpack('<H', dataSb1[ITEMS_OFFSET+i*4:ITEMS_OFFSET+i*4+2])[0]
+                itemQuantity = xor(struct.unpack('<H', dataSb1[ITEMS_OFFSET+i*4+2:ITEMS_OFFSET+i*4+4])[0], encryptionKey&0xffff)
+                if itemId!=0:
+                    objs['items'].append({'id':itemId,'quantity':itemQuantity})
+    if 'dex' in fields:
+        # Tamper the pokedex
+        if tamperObject and tamperObject.get('fullPokedex'):
+            for i in range(DEXSIZE):
+                dataSb1[DEXSEEN_OFFSET+i]=0xff
+                dataSb1[DEXCAUGHT_OFFSET+i]=0xff
+        if tamperObject and 'pokedex' in tamperObject:
+            if saveFormat==2:
+                dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE], dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE] = pokedexDataToBitmask(
+                    tamperObject['pokedex'],
+                    objs['pkmns'],
+                    dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE],
+                    dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE],
+                    saveFormat)
+        objs['pokedex'] = pokedexBitmaskToData( dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE], dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE], saveFormat)
+    if 'trainer' in fields:
+        objs['trainer'] = {
+            'name':decodeString(trainerName),
+            'id':trainerId,
+            'gender':trainerGender
+        }
+        objs['stats'] = {
+            'hours':hours,
+            'minutes':minutes,
+            'money':money,
+        }
+    if 'trainer' in fields or 'items' in fields:
+        objs['key'] = encryptionKey
+    if 'hof' in fields:
+        objs['hof'] = list(iterHallOfFame(sectors))
     return objs
 
+def formatObjects(obj):
+    """
+    Render the output of processObjects as a report. Only the decoded sections are included.
+    """
+    lines = [f"   Version:        {obj['version']} (1 = Previous to 2.0; 2 for the newest versions 2.0, 2.0.1...)"]
+    if 'trainer' in obj:
+        lines.append(f"   Trainer Name:   {obj['trainer']['name']} (Gender: {obj['trainer']['gender']}; MALE=0, FEMALE=1)")
+        lines.append(f"   Trainer Id:     0x{obj['trainer']['id']:04X}")
+        lines.append(f"   Played Time:    {obj['stats']['hours']:02}:{obj['stats']['minutes']:02}")
+        lines.append(f"   Money:          {obj['stats']['money']}")
+    if 'key' in obj:
+        lines.append(f"   Encryption key: 0x{obj['key']}")
+    if 'items' in obj:
+        lines.append(f"   Items:          {len(obj['items'])}")
+        lines.extend("     "+str(it) for it in obj['items'])
+    if 'pokedex' in obj:
+        lines.append(f"   Pokedex:        seen {sum(1 for entry in obj['pokedex'] if entry)}; caught {obj['pokedex'].count(2)}")
+    if 'pkmns' in obj:
+        lines.append(f"   Pokemons:       {len(obj['pkmns'])}")
+        lines.extend(formatMon(pkmn) for pkmn in obj['pkmns'])
+    if 'hof' in obj:
+        lines.extend(formatHallOfFame(obj['hof']))
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
 def printObjects(obj):
     """
-    Print the output of processObjects to stdout
+    Print the output of processObjects to stdout, with a single write
     """
-    print(f"   Version:        {obj['version']} (1 = Previous to 2.0; 2 for the newest versions 2.0, 2.0.1...)")
-    print(f"   Trainer Name:   {obj['trainer']['name']} (Gender: {obj['trainer']['gender']}; MALE=0, FEMALE=1)")
-    print(f"   Trainer Id:     0x{obj['trainer']['id']:04X}")
-    print(f"   Played Time:    {obj['stats']['hours']:02}:{obj['stats']['minutes']:02}")
-    print(f"   Money:          {obj['stats']['money']}")
-    print(f"   Encryption key: 0x{obj['key']}")
-    print(f"   Items:          {len(obj['items'])}")
-    for it in obj['items']:
-        print("     "+str(it))
-    print(f"   Pokemons:       {len(obj['pkmns'])}")
-    for pkmn in obj['pkmns']:
-        printMon(pkmn)
-    print()
+    sys.stdout.write(formatObjects(obj))
 
 
-def processSavFile(savfile, tamperObject=None):
+def processSavFile(savfile, tamperObject=None, fields=None):
     """
     This routine process a .sav given its path
+
+    :param savfile: Path to the .sav file (or its content, see openSavSource).
+    :param tamperObject: Optional modifications to apply (see processObjects).
+    :param fields: Optional iterable of sections to decode (see SAVE_FIELDS). Only the sectors
+                   holding them are read. None to read and decode everything.
+    :return: A tuple (sectors, objs)
     """
-    ##
-    # Try to process the elements as a .sav of the version 1.3.2
-    prepareGlobalsForVersion(1)
-    sectors = processSavedSector(savfile)
-    objs = processObjects(sectors, tamperObject)
-    if objs==None: # If there is an error, try again but with the slot format for the 2.0.X game 
-        prepareGlobalsForVersion(2)
-        sectors = processSavedSector(savfile)
-        objs = processObjects(sectors, tamperObject)
+    if tamperObject:
+        fields = None
+    with savfileContext(savfile if isinstance(savfile, str) else CURRENT_SAVFILE.get()):
+        ##
+        # Try to process the elements as a .sav of the version 1.3.2
+        prepareGlobalsForVersion(1)
+        sectors = processSavedSector(savfile, getFieldsBlocks(fields) if fields is not None else None)
+        objs = processObjects(sectors, tamperObject, fields)
+        if objs==None: # If there is an error, try again but with the slot format for the 2.0.X game 
+            prepareGlobalsForVersion(2)
+            sectors = processSavedSector(savfile, getFieldsBlocks(fields) if fields is not None else None)
+            objs = processObjects(sectors, tamperObject, fields)
     return sectors, objs
 
 
+def getMergeTamperObject(objs):
+    """
+    Return the tamperObject (see processObjects) that merges the objects of a .sav into another one
+    """
+    return {
+        'version': objs['version'],
+        'money':   objs['stats']['money'],
+        'hours':   objs['stats']['hours'],
+        'minutes': objs['stats']['minutes'],
+        'items':   bagItemsToVersion2(objs['items']),
+        'cloneFirstinParty': False,
+        'pkmn': [a['data'] for a in objs['pkmns']],
+        'fullPokedex': False,
+        'pokedex': objs['pokedex'],
+    }
+
+
+def planMerge(savfile, mergefile):
+    """
+    Compute what a merge of mergefile into savfile would do (see main), as a list of operations, without
+    serializing any mon, rewriting the bag or the Pokedex, or writing a .sav. Both files are only decoded.
+
+    The plan is a dict that can be dumped as JSON:
+
+    {
+        input, inputSha256, merge, mergeSha256 -> files of the plan
+        pkmn         -> [{from: {box, pos}, to: {box, pos}, nPkmn, pkmnName, shiny}] mons moved to the free slots
+        pkmnDropped  -> [{from: {box, pos}, nPkmn, pkmnName, shiny}] mons without a free slot
+        items        -> kept: [{id, quantity, sourceId}] bag after bagItemsToVersion2; dropped: [{id, quantity}];
+                        replaced: number of items of the input bag that are removed
+        pokedex      -> seen, caught: species whose bits are set by the merge;
+                        seenCleared, caughtCleared: species whose bits are cleared by the merge
+        stats        -> money, hours, minutes: {from, to}
+    }
+
+    :param savfile: Path to the .sav file that receives the merge (2.0 format).
+    :param mergefile: Path to the .sav file that is merged.
+    :return: The plan
+    """
+    _, src = processSavFile(mergefile, fields=SAVE_FIELDS)
+    sectors, dst = processSavFile(savfile, fields=SAVE_FIELDS)
+    plan = {
+        'input':       os.path.abspath(savfile),
+        'inputSha256': hashFile(savfile),
+        'merge':       os.path.abspath(mergefile),
+        'mergeSha256': hashFile(mergefile),
+        'pkmn':        [],
+        'pkmnDropped': [],
+    }
+    ##
+    # Mons: the free slots of the boxes are filled in order (see processObjects)
+    def describe(pkmn):
+        return {'nPkmn': pkmn['data']['nPkmn'], 'pkmnName': pkmn['data']['pkmnName'], 'shiny': pkmn['data']['shiny']}
+    used = {(p['box'], p['pos']) for p in dst['pkmns']}
+    freeSlots = [(i+1, j+1) for i in range(TOTAL_BOXES) for j in range(PKMN_PER_BOX) if (i+1, j+1) not in used]
+    inserted = []
+    for pkmn, slot in zip(src['pkmns'], freeSlots):
+        plan['pkmn'].append({'from': {'box': pkmn['box'], 'pos': pkmn['pos']}, 'to': {'box': slot[0], 'pos': slot[1]}, **describe(pkmn)})
+        inserted.append({'data': pkmn['data'], 'box': slot[0], 'pos': slot[1]})
+    for pkmn in src['pkmns'][len(freeSlots):]:
+        plan['pkmnDropped'].append({'from': {'box': pkmn['box'], 'pos': pkmn['pos']}, **describe(pkmn)})
+    ##
+    # Items: bagItemsToVersion2 changes the ids, so it works over copies tagged with their position
+    items = [dict(it, index=i) for i, it in enumerate(src['items'])]
+    kept = bagItemsToVersion2(items)[:BAG_ITEM_CAPACITY]
+    keptIndexes = {it['index'] for it in kept}
+    plan['items'] = {
+        'kept':     [{'id': it['id'], 'quantity': it['quantity'], 'sourceId': src['items'][it['index']]['id']} for it in kept],
+        'dropped':  [it for i, it in enumerate(src['items']) if i not in keptIndexes],
+        'replaced': len(dst['items']),
+    }
+    ##
+    # Pokedex: the new bitmasks are computed over copies and compared with the current ones
+    plan['pokedex'] = {'seen': [], 'caught': [], 'seenCleared': [], 'caughtCleared': []}
+    if dst['version'] == 2:
+        dataSb1 = sectors['SLOT1_SAVEBLOCK1']['data']
+        seen = bytearray(dataSb1[DEXSEEN_OFFSET:DEXSEEN_OFFSET+DEXSIZE])
+        caught = bytearray(dataSb1[DEXCAUGHT_OFFSET:DEXCAUGHT_OFFSET+DEXSIZE])
+        newSeen, newCaught = pokedexDataToBitmask(src['pokedex'], dst['pkmns'] + inserted, bytearray(seen), bytearray(caught), dst['version'])
+        for key, old, new in (('seen', seen, newSeen), ('caught', caught, newCaught)):
+            plan['pokedex'][key] = [i*8+j for i in range(DEXSIZE) for j in range(8) if (new[i] & ~old[i]) & (1<<j)]
+            plan['pokedex'][key + 'Cleared'] = [i*8+j for i in range(DEXSIZE) for j in range(8) if (old[i] & ~new[i]) & (1<<j)]
+    ##
+    # Stats: the money is only overwritten if the merged file has some
+    plan['stats'] = {
+        'money':   {'from': dst['stats']['money'], 'to': src['stats']['money'] if src['stats']['money'] > 0 else dst['stats']['money']},
+        'hours':   {'from': dst['stats']['hours'], 'to': src['stats']['hours']},
+        'minutes': {'from': dst['stats']['minutes'], 'to': src['stats']['minutes']},
+    }
+    return plan
+
+
+def applyMergePlan(plan, savfile):
+    """
+    Apply a plan computed by planMerge. The files must not have changed since the plan was computed.
+    The mons are placed in the free slots in the order of the plan, so a plan whose operations were
+    removed still fills the boxes without gaps.
+
+    :param plan: The plan (see planMerge). It can be loaded from its JSON.
+    :param savfile: Path to the .sav file that receives the merge.
+    :return: A tuple (sectors, objs) as processSavFile, with the merge already applied.
+    """
+    if hashFile(savfile) != plan['inputSha256']:
+        raise ValueError(f"'{savfile}' has changed since the plan was computed")
+    if hashFile(plan['merge']) != plan['mergeSha256']:
+        raise ValueError(f"'{plan['merge']}' has changed since the plan was computed")
+    _, src = processSavFile(plan['merge'], fields=SAVE_FIELDS)
+    mons = {(p['box'], p['pos']): p['data'] for p in src['pkmns']}
+    tamperObject = {
+        'version': src['version'],
+        'money':   plan['stats']['money']['to'],
+        'hours':   plan['stats']['hours']['to'],
+        'minutes': plan['stats']['minutes']['to'],
+        'items':   [{'id': it['id'], 'quantity': it['quantity']} for it in plan['items']['kept']],
+        'cloneFirstinParty': False,
+        'pkmn': [mons[(op['from']['box'], op['from']['pos'])] for op in plan['pkmn']],
+        'fullPokedex': False,
+        'pokedex': src['pokedex'],
+    }
+    return processSavFile(savfile, tamperObject)
+
+
+class SavEditor:
+    """
+    Editor of the fields of a .sav that patches only the bytes involved, in place. The file is kept in memory
+    as it was read and each edit marks the sectors it touches as dirty. Only their checksums are computed
+    again when the file is saved, so many small edits do not cost a full decode/encode of the .sav.
+    The globals are configured for the version of the .sav at the start of every method.
+
+    Example:
+        editor = SavEditor('Emerald Rogue_2_0.sav')
+        editor.setMoney(999999)
+        editor.setItem(4, 99)
+        editor.save('Emerald Rogue_2_0_edited.sav')
+    """
+    def __init__(self, savfile):
+        """
+        :param savfile: Path to the .sav file (or its content, see openSavSource).
+        """
+        self.path = savfile if isinstance(savfile, str) else None
+        with openSavSource(savfile) as file:
+            self.raw = bytearray(file.read())
+        file = io.BytesIO(self.raw)
+        self.sectorMap = readSectorMap(file)
+        self.version = prepareGlobalsForFile(file, self.sectorMap)
+        self.dirty = set()
+        self.trainerId = struct.unpack('<I', self._read('SLOT1_SAVEBLOCK2', PLAYER_NAME_LENGTH + 3, TRAINER_ID_LENGTH))[0]
+        self.key = struct.unpack('<I', self._read('SLOT1_SAVEBLOCK2', ENCRIPTIONKEY_OFFSET, 4))[0]
+
+    def _read(self, block, offset, size):
+        """
+        Read the bytes [offset, offset+size) of a block (see iterBlockRanges)
+        """
+        return b''.join(bytes(self.raw[physical:physical+length]) if physical is not None else bytes(length)
+                        for physical, length in iterBlockRanges(self.sectorMap, block, offset, size))
+
+    def _patch(self, block, offset, data):
+        """
+        Write the data at the offset of a block and mark the sectors that hold it as dirty
+        """
+        pos = 0
+        for physical, length in iterBlockRanges(self.sectorMap, block, offset, len(data)):
+            if physical is None:
+                raise ValueError(f"The block {block} is not complete in the file")
+            self.raw[physical:physical+length] = data[pos:pos+length]
+            self.dirty.add(physical - physical % SECTOR_SIZE)
+            pos += length
+
+    def setMoney(self, money):
+        """
+        Set the money of the trainer
+        """
+        prepareGlobalsForVersion(self.version)
+        self._patch('SLOT1_SAVEBLOCK1', MONEY_OFFSET, struct.pack('<I', xor(self.key, money)))
+
+    def setPlaytime(self, hours, minutes=None):
+        """
+        Set the played time. The minutes are kept if they are not given.
+        """
+        prepareGlobalsForVersion(self.version)
+        offset = PLAYER_NAME_LENGTH + 3 + TRAINER_ID_LENGTH # name, gender, specialSaveWarpFlags, trainerId
+        self._patch('SLOT1_SAVEBLOCK2', offset, struct.pack('<H', hours))
+        if minutes is not None:
+            self._patch('SLOT1_SAVEBLOCK2', offset + 2, bytes([minutes]))
+
+    def setItem(self, itemId, quantity):
+        """
+        Set the quantity of an item of the bag. The item takes the first empty slot (of its pocket, for the
+        1.3.2 version; see BAG_POCKETS_V1) if it is not in the bag and a quantity of 0 removes it.
+        """
+        prepareGlobalsForVersion(self.version)
+        bag = self._read('SLOT1_SAVEBLOCK1', ITEMS_OFFSET, BAG_ITEM_CAPACITY*4)
+        ids = [struct.unpack_from('<H', bag, i*4)[0] for i in range(BAG_ITEM_CAPACITY)]
+        first, last = 0, BAG_ITEM_CAPACITY
+        if self.version == 1:
+            pockets = [(start, start + size) for low, high, start, size in BAG_POCKETS_V1 if low <= itemId <= high]
+            if not pockets:
+                raise ValueError(f"The pocket of the item {itemId} is not known")
+            first, last = pockets[0]
+        if itemId in ids[first:last]:
+            slot = first + ids[first:last].index(itemId)
+        elif quantity == 0:
+            return
+        elif 0 in ids[first:last]:
+            slot = first + ids[first:last].index(0)
+        else:
+            raise ValueError("The pocket of the item is full")
+        if quantity == 0:
+            self._patch('SLOT1_SAVEBLOCK1', ITEMS_OFFSET + slot*4, bytes(4))
+        else:
+            self._patch('SLOT1_SAVEBLOCK1', ITEMS_OFFSET + slot*4, struct.pack('<HH', itemId, xor(self.key, quantity) & 0xffff))
+
+    def putMon(self, box, slot, mon):
+        """
+        Put a mon in a slot of a PC box. The mon is given to the trainer of the .sav.
+
+        :param box: Box, from 1 to TOTAL_BOXES.
+        :param slot: Position in the box, starting at 1.
+        :param mon: The mon as returned by createMon (e.g. readMon(...)['data']), or None to empty the slot.
+        """
+        prepareGlobalsForVersion(self.version)
+        if not 1 <= box <= TOTAL_BOXES or not 1 <= slot <= PKMN_PER_BOX:
+            raise ValueError(f"The box must be between 1 and {TOTAL_BOXES} and the position between 1 and {PKMN_PER_BOX}")
+        if mon is None:
+            data = bytes(PKMNBOX_STRUCT_SIZE)
+        else:
+            # serializeMon modifies the substructures that it converts, so it works on a copy
+            mon = dict(mon, type0=bytearray(mon['type0']), type3=bytearray(mon['type3']), trainer=dict(mon['trainer']))
+            data = serializeMon(mon, self.version, self.trainerId)
+        offset = FIRSTPKMN_IN_BOX_OFFSET + ((box-1)*PKMN_PER_BOX + slot-1)*PKMNBOX_STRUCT_SIZE
+        self._patch('SLOT1_PKMNSTORAGE', offset, data)
+
+    def save(self, path=None):
+        """
+        Compute the checksums of the dirty sectors and write the .sav (by default, over the one that was read)
+        """
+        prepareGlobalsForVersion(self.version)
+        for physical in sorted(self.dirty):
+            checksum = calculateChecksum(self.raw[physical:physical+SECTOR_DATA_SIZE], SECTOR_DATA_SIZE)
+            struct.pack_into('<H', self.raw, physical + SECTOR_SIZE - SECTOR_FOOTER_STRUCT.size + 2, checksum)
+        self.dirty.clear()
+        path = path or self.path
+        if path is None:
+            raise ValueError("An output path is required")
+        writeFileAtomically(path, self.raw)
+
+
+def newStats():
+    """
+    Return an empty aggregate of statistics (see collectStats). The aggregates are merged with mergeStats,
+    which is associative, and their size does not depend on the number of saves:
+
+    {
+        saves, failed, pkmns       -> counters
+        species, shiny             -> arrays indexed by species (2.0 numbering)
+        items                      -> Counter {item id (2.0 numbering): number of saves that own it}
+        dexCaught                  -> Counter {species caught: number of saves}
+        playHours                  -> Counter {hours played: number of saves}
+    }
+    """
+    return {
+        'saves': 0,
+        'failed': 0,
+        'pkmns': 0,
+        'species': array.array('L', bytes(array.array('L').itemsize*(NPOKEMON_V2+1))),
+        'shiny': array.array('L', bytes(array.array('L').itemsize*(NPOKEMON_V2+1))),
+        'items': collections.Counter(),
+        'dexCaught': collections.Counter(),
+        'playHours': collections.Counter(),
+    }
+
+
+def mergeStats(total, partial):
+    """
+    Add the partial aggregate to the total one (see newStats)
+    """
+    for key in ('saves', 'failed', 'pkmns'):
+        total[key] += partial[key]
+    for key in ('species', 'shiny'):
+        for i, n in enumerate(partial[key]):
+            if n:
+                total[key][i] += n
+    for key in ('items', 'dexCaught', 'playHours'):
+        total[key].update(partial[key])
+    return total
+
+
+def collectStats(inputs):
+    """
+    Map step of the statistics: decode the saves and reduce them to a single aggregate (see newStats).
+    The Hall of Fame, Trainer Hill and Recorded Battle sectors are not read.
+
+    :param inputs: A list of tuples (name, source) (see iterSavInputs).
+    :return: The aggregate of the saves
+    """
+    stats = newStats()
+    for name, source in inputs:
+        with savfileContext(name):
+            try:
+                if source is None:
+                    raise ValueError("it is not a .sav")
+                _, objs = processSavFile(source, fields=SAVE_FIELDS)
+            except (OSError, ValueError, struct.error) as e:
+                objs = None
+                logger.warning("The file can not be processed: %s", e)
+        if objs is None:
+            stats['failed'] += 1
+            continue
+        stats['saves'] += 1
+        stats['pkmns'] += len(objs['pkmns'])
+        for pkmn in objs['pkmns']:
+            species = pkmn['data']['nPkmn']
+            if objs['version'] == 1:
+                species = speciesToVersion2(species)
+            if species <= NPOKEMON_V2:
+                stats['species'][species] += 1
+                if pkmn['data']['shiny']:
+                    stats['shiny'][species] += 1
+        stats['items'].update({itemIdToVersion2(it['id']) if objs['version'] == 1 else it['id'] for it in objs['items']})
+        stats['dexCaught'][objs['pokedex'].count(2)] += 1
+        stats['playHours'][objs['stats']['hours']] += 1
+    return stats
+
+
+def computeFleetStats(paths, jobs=None, chunkSize=16):
+    """
+    Compute the statistics (see newStats) of every .sav under the given paths (see iterSavInputs).
+    The saves are split in chunks that are reduced by a pool of worker processes, and the partial aggregates
+    are merged as they arrive. Only a few chunks are in flight at a time, so the memory does not depend
+    on the number of saves.
+
+    :param paths: List of .sav files, archives or folders.
+    :param jobs: Number of worker processes (by default, one per CPU). 1 to work in this process.
+    :param chunkSize: Number of saves per task.
+    :return: The aggregate of all the saves
+    """
+    jobs = jobs or os.cpu_count() or 1
+    def iterChunks():
+        chunk = []
+        for path in paths:
+            for item in iterSavInputs(path):
+                chunk.append(item)
+                if len(chunk) == chunkSize:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+    total = newStats()
+    if jobs == 1:
+        for chunk in iterChunks():
+            mergeStats(total, collectStats(chunk))
+        return total
+    with multiprocessing.Pool(jobs) as pool:
+        pending = collections.deque()
+        for chunk in iterChunks():
+            pending.append(pool.apply_async(collectStats, (chunk,)))
+            if len(pending) >= 2*jobs:
+                mergeStats(total, pending.popleft().get())
+        while pending:
+            mergeStats(total, pending.popleft().get())
+    return total
+
+
+def percentileFromHistogram(histogram, q):
+    """
+    Return the value at the percentile q (0-100) of a histogram {value: count} (nearest rank)
+    """
+    count = sum(histogram.values())
+    if count == 0:
+        return None
+    rank = max(1, -(-q*count // 100))
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= rank:
+            return value
+
+
+def formatStats(stats):
+    """
+    Render the statistics (see newStats) as a report
+    """
+    def percentiles(histogram):
+        return ", ".join(f"p{q}={percentileFromHistogram(histogram, q)}" for q in (0, 10, 25, 50, 75, 90, 100))
+    lines = [
+        f"   Saves:          {stats['saves']} ({stats['failed']} failed)",
+        f"   Pokemons:       {stats['pkmns']} ({sum(stats['shiny'])} shiny)",
+        f"   Pokedex caught: {percentiles(stats['dexCaught'])}",
+        f"   Played hours:   {percentiles(stats['playHours'])}",
+        f"   Species:        {sum(1 for n in stats['species'] if n)}",
+    ]
+    lines.extend(f"     #{i}: {n} (shiny: {stats['shiny'][i]})" for i, n in enumerate(stats['species']) if n)
+    lines.append(f"   Items:          {len(stats['items'])}")
+    lines.extend(f"     {{'id': {i}, 'saves': {stats['items'][i]}}}" for i in sorted(stats['items']))
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def readJournal(journalPath):
+    """
+    Read the journal of a batch conversion (see convertBatch). A line that can not be parsed (e.g. the last
+    one, if the process was killed while writing it) is ignored.
+
+    :return: A dict {input name: last entry of the input}
+    """
+    entries = {}
+    if not os.path.exists(journalPath):
+        return entries
+    with open(journalPath, 'rb') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and 'input' in entry:
+                entries[entry['input']] = entry
+    return entries
+
+
+def appendJournal(journal, entry):
+    """
+    Append an entry to the journal of a batch conversion with a single write, flushed to the disk
+    """
+    journal.write((json.dumps(entry) + "\n").encode())
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def getBatchInputName(source, name):
+    """
+    Return the name of an input of a batch conversion relative to its source (see iterSavInputs): its path
+    inside the folder and/or the archive. The journal uses it, so it does not depend on the current folder.
+    """
+    relative = name[len(source):] if name.startswith(source) else name
+    return relative.lstrip('/\\:' + os.sep) or os.path.basename(name)
+
+
+def getBatchOutputName(inputName):
+    """
+    Return the path of the output of an input of a batch conversion (see getBatchInputName), relative to
+    the output folder. The members of an archive are written in a folder with the name of the archive.
+    """
+    relative = os.path.normpath(inputName.replace(':', os.sep))
+    if os.path.isabs(relative) or relative.split(os.sep)[0] == '..':
+        raise ValueError(f"'{inputName}' can not be written inside the output folder")
+    return relative
+
+
+def convertBatch(template, source, outputDir, journalPath=None):
+    """
+    Merge every 1.3.2 .sav of a folder or an archive (see iterSavInputs) into the template .sav (as with -m), writing
+    the results to outputDir. The saves of other versions are recorded as failed. Each output is written atomically and recorded in an append-only journal
+    (one JSON line per input: input, its SHA-256, the SHA-256 of the template, status, output and its SHA-256).
+    The input is named relative to the source (see getBatchInputName) and the output relative to outputDir.
+
+    If the conversion is started again with the same journal, the inputs that were already converted are
+    skipped, as long as neither the input, the template nor the output has changed since. The inputs that
+    failed are tried again, but they are only recorded again if the input or the template has changed.
+
+    :param template: Path to the .sav that receives the content of the inputs.
+    :param source: Folder or archive with the .sav files to convert.
+    :param outputDir: Folder of the outputs.
+    :param journalPath: Path to the journal (by default, BATCH_JOURNAL_NAME in outputDir).
+    :return: A dict {converted, skipped, failed} with the number of inputs of each case
+    """
+    os.makedirs(outputDir, exist_ok=True)
+    journalPath = journalPath or os.path.join(outputDir, BATCH_JOURNAL_NAME)
+    done = readJournal(journalPath)
+    with open(template, 'rb') as f:
+        templateData = f.read()
+    templateHash = hashlib.sha256(templateData).hexdigest()
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+    outputRoot = os.path.abspath(outputDir) + os.sep
+    with open(journalPath, 'ab') as journal:
+        if journal.tell() > 0: # A torn last line must not be joined to the next entry
+            with open(journalPath, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    journal.write(b"\n")
+        for name, input_ in iterSavInputs(source):
+            if isinstance(input_, str) and os.path.abspath(input_).startswith(outputRoot):
+                continue
+            with savfileContext(name):
+                inputName = getBatchInputName(source, name)
+                if isinstance(input_, str):
+                    with open(input_, 'rb') as f:
+                        input_ = f.read()
+                inputHash = hashlib.sha256(input_).hexdigest() if input_ is not None else None
+                previous = done.get(inputName)
+                unchanged = previous and previous.get('inputSha256') == inputHash and previous.get('templateSha256') == templateHash
+                if (unchanged and previous.get('status') == 'done' and os.path.exists(os.path.join(outputDir, previous['output']))
+                        and hashFile(os.path.join(outputDir, previous['output'])) == previous.get('outputSha256')):
+                    logger.debug("Already converted to '%s'", previous['output'])
+                    counts['skipped'] += 1
+                    continue
+                entry = {'input': inputName, 'inputSha256': inputHash, 'templateSha256': templateHash,
+                         'status': 'failed', 'output': None, 'outputSha256': None}
+                try:
+                    if input_ is None:
+                        raise ValueError("it is not a .sav")
+                    outputName = getBatchOutputName(inputName)
+                    outputPath = os.path.join(outputDir, outputName)
+                    # The same checks as the .sav files of the archives (see readArchiveMember)
+                    if not SAV_MIN_SIZE <= len(input_) <= SAV_MAX_SIZE or not isSavSector(input_[:SECTOR_SIZE]):
+                        raise ValueError("it is not a .sav")
+                    _, objs = processSavFile(input_, fields=SAVE_FIELDS)
+                    if objs is None:
+                        raise ValueError("it is not a valid .sav")
+                    if objs['version'] != 1: # The merge converts the items and the mons from the 1.3.2 numbering
+                        raise ValueError("it is not a 1.3.2 .sav")
+                    sectors, _ = processSavFile(templateData, getMergeTamperObject(objs))
+                    os.makedirs(os.path.dirname(outputPath), exist_ok=True)
+                    tmpPath = f"{outputPath}.tmp{os.getpid()}"
+                    saveSectors(sectors, tmpPath)
+                    entry['outputSha256'] = hashFile(tmpPath)
+                    os.replace(tmpPath, outputPath)
+                    entry['output'] = outputName
+                    entry['status'] = 'done'
+                    counts['converted'] += 1
+                    logger.info("Converted to '%s'", outputPath)
+                except (OSError, ValueError, struct.error) as e:
+                    entry['error'] = str(e)
+                    counts['failed'] += 1
+                    logger.warning("The file can not be converted: %s", e)
+                if unchanged and previous.get('status') == 'failed' and entry['status'] == 'failed':
+                    continue # The journal already records the failure
+                appendJournal(journal, entry)
+    return counts
+
+
+def parseMonSlot(text):
+    """
+    Parse the BOX:POS argument given to --mon
+    """
+    try:
+        box, pos = (int(v) for v in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not in the format BOX:POS")
+    return box, pos
+
+
+def parseFields(text):
+    """
+    Parse the comma separated list of sections given to --only
+    """
+    fields = [f.strip() for f in text.split(',') if f.strip()]
+    for f in fields:
+        if f not in SAVE_FIELDS + EXTRA_FIELDS:
+            raise argparse.ArgumentTypeError(f"unknown section '{f}' (choose from {','.join(SAVE_FIELDS + EXTRA_FIELDS)})")
+    return fields
+
+
 
 ################
 # Main routine #
@@ -902,6 +2304,23 @@ def main():
         python pokeemerald-rogue_savconverter.py Emerald\ Rogue_1_3_2.sav
     3. Merge the pokemon, pokedex, money and items of a 1.3.2 .sav with a 2.0 one in the output file
         python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav -m Emerald\ Rogue_1_3_2a.sav -o Emerald\ Rogue_2_0_merged.sav
+    4. Print only the trainer and the party of a .sav file
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav --only trainer,party
+    5. Restore the last backup of a .sav file (a snapshot is stored in the backup store before every conversion)
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav --restore
+    6. Print every .sav file inside an archive (zip, tar, tar.gz...) without extracting it
+        python pokeemerald-rogue_savconverter.py saves.zip --only trainer
+    7. Print the mon of the slot 12 of the box 7 (box 0 is the party)
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav --mon 7:12
+    8. Preview the merge of example 3 as JSON and apply it later
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav -m Emerald\ Rogue_1_3_2a.sav --plan merge.json
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav --apply-plan merge.json -o Emerald\ Rogue_2_0_merged.sav
+    9. Print statistics (species, shinies, items, Pokedex, played time) of every .sav in a folder, using 4 processes
+        python pokeemerald-rogue_savconverter.py saves/ --stats -j 4
+    10. Merge as in example 3 and sort the mons of the PC boxes by species, without gaps between them
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav -m Emerald\ Rogue_1_3_2a.sav -o Emerald\ Rogue_2_0_merged.sav --sort-boxes
+    11. Merge every 1.3.2 .sav of a folder into a 2.0 .sav. If it is interrupted, the same command resumes it
+        python pokeemerald-rogue_savconverter.py Emerald\ Rogue_2_0.sav --batch old_saves/ --output-dir converted/
 
 
         Emerald\ Rogue_2_0.sav + Emerald\ Rogue_1_3_2a.sav => Emerald\ Rogue_2_0_merged.sav
@@ -913,10 +2332,108 @@ def main():
     parser.add_argument('-o', '--output-file', nargs='?', default=None, help='The output .sav file')
     parser.add_argument('-m', '--merge', nargs='?', default=None, help='Merge the content of this file into the input_file')  # on/off flag
     parser.add_argument('-t', '--tamper',action='store_true', help='Increment the money of the user/Full Pokedex/Testing purposes')  # on/off flag
+    parser.add_argument('--only', type=parseFields, default=None, help=f'Only read and print these comma separated sections ({",".join(SAVE_FIELDS + EXTRA_FIELDS)})')
+    parser.add_argument('--hof', action='store_true', help='Print the teams of the Hall of Fame too')
+    parser.add_argument('--mon', type=parseMonSlot, default=None, metavar='BOX:POS', help='Only read and print the mon of this slot (box 0 is the party)')
+    parser.add_argument('--plan', default=None, metavar='PLANFILE', help='Write the plan of the merge (-m) as JSON to this file (- for stdout) instead of merging')
+    parser.add_argument('--apply-plan', default=None, metavar='PLANFILE', help='Apply a plan written by --plan to the input file (requires -o)')
+    parser.add_argument('--compact-boxes', action='store_true', help='Move the mons of the PC boxes to the first slots, removing the gaps (requires -o)')
+    parser.add_argument('--sort-boxes', action='store_true', help='Compact the PC boxes and sort their mons by species (requires -o)')
+    parser.add_argument('--stats', action='store_true', help='Print aggregated statistics of every .sav under the input (a .sav, an archive or a folder)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Number of processes for --stats (default: one per CPU)')
+    parser.add_argument('--batch', default=None, metavar='SOURCE', help='Merge every 1.3.2 .sav of this folder or archive into the input file (requires --output-dir). It can be resumed')
+    parser.add_argument('--output-dir', default=None, help='Folder of the outputs of --batch')
+    parser.add_argument('--journal', default=None, help=f'Journal of --batch, used to resume it (default: {BATCH_JOURNAL_NAME} in the output folder)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log the details of every sector')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Do not log anything')
+    parser.add_argument('--backup-store', default=None, help=f'Folder of the backup store (default: {BACKUP_STORE_DIR} next to the input file)')
+    parser.add_argument('--list-backups', action='store_true', help='List the snapshots of the input file in the backup store')
+    parser.add_argument('--restore', nargs='?', const='latest', default=None, metavar='SNAPSHOT', help='Restore a snapshot (the latest one of the input file by default) to the output file or, if it is not given, to the input file')
     ##
     # Parse the arguments
     args = parser.parse_args()
-    backupFileIfNeeded(args.input_file, args.input_file+".bak")
+    configureLogging(args.verbose, args.quiet)
+    if (args.only is not None or args.hof or args.mon) and (args.output_file or args.merge or args.tamper):
+        parser.error('--only, --hof and --mon can only be used to print a .sav file')
+    if args.hof:
+        args.only = list(args.only or SAVE_FIELDS) + ['hof']
+    if args.plan and not args.merge:
+        parser.error('--plan requires the file to merge (-m)')
+    if args.apply_plan and (not args.output_file or args.merge or args.tamper):
+        parser.error('--apply-plan requires an output file (-o) and can not be used with -m or -t')
+    if (args.sort_boxes or args.compact_boxes) and (not args.output_file or args.apply_plan):
+        parser.error('--sort-boxes and --compact-boxes require an output file (-o) and can not be used with --apply-plan')
+    if args.batch and (not args.output_dir or args.output_file or args.merge or args.tamper):
+        parser.error('--batch requires an output folder (--output-dir) and can not be used with -o, -m or -t')
+    if args.plan:
+        plan = json.dumps(planMerge(args.input_file, args.merge), indent=1)
+        if args.plan == '-':
+            sys.stdout.write(plan + "\n")
+        else:
+            writeFileAtomically(args.plan, plan.encode())
+        return
+    if args.stats:
+        sys.stdout.write(formatStats(computeFleetStats([args.input_file], args.jobs)))
+        return
+    if args.batch:
+        counts = convertBatch(args.input_file, args.batch, args.output_dir, args.journal)
+        sys.stdout.write(f"Converted: {counts['converted']}  Skipped: {counts['skipped']}  Failed: {counts['failed']}\n")
+        return
+    if args.mon:
+        if isArchive(args.input_file):
+            parser.error('--mon can not be used with an archive')
+        if not isSavFile(args.input_file):
+            parser.error(f"'{args.input_file}' is not a .sav file")
+        try:
+            mon = readMon(args.input_file, *args.mon)
+        except ValueError as e:
+            parser.error(str(e))
+        if mon:
+            printMon(mon)
+        else:
+            sys.stdout.write(f"The slot {args.mon[0]}:{args.mon[1]} is empty\n")
+        return
+    store = args.backup_store or getBackupStore(args.input_file)
+    if args.list_backups:
+        sys.stdout.write("".join(f"{manifest['id']}  {manifest['created']}  {manifest['size']} bytes\n" for manifest in listBackups(store, args.input_file)))
+        return
+    if args.restore:
+        snapshotId = args.restore
+        if snapshotId == 'latest':
+            manifests = listBackups(store, args.input_file)
+            if not manifests:
+                parser.error(f"there are no snapshots of '{args.input_file}' in '{store}'")
+            snapshotId = manifests[-1]['id']
+        target = args.output_file or args.input_file
+        if os.path.exists(target): # The restore can be undone too
+            backupFile(target, store)
+        restoreBackup(store, snapshotId, target)
+        return
+    if isArchive(args.input_file):
+        if args.output_file or args.merge or args.tamper:
+            parser.error('the saves of an archive can only be printed')
+        for name, source in iterSavInputs(args.input_file):
+            with savfileContext(name):
+                if source is None:
+                    logger.warning("The file is not a .sav")
+                    continue
+                _, objs = processSavFile(source, fields=args.only)
+            sys.stdout.write(f"##### {name}\n" + formatObjects(objs))
+        return
+    if args.output_file:
+        backupFile(args.input_file, store)
+        if os.path.exists(args.output_file) and not os.path.samefile(args.input_file, args.output_file):
+            backupFile(args.output_file, store)
+    if args.apply_plan:
+        with open(args.apply_plan, 'r') as f:
+            plan = json.load(f)
+        try:
+            sectors, objs = applyMergePlan(plan, args.input_file)
+        except ValueError as e:
+            parser.error(str(e))
+        printObjects(objs)
+        saveSectors(sectors, args.output_file)
+        return
     if args.tamper:
         tamperObject = {
             'version': 1,
@@ -930,21 +2447,20 @@ def main():
         tamperObject = None
     
     if args.merge:
-        _, objs = processSavFile(args.merge)
-        tamperObject = {
-            'version': objs['version'],
-            'money':   objs['stats']['money'],
-            'hours':   objs['stats']['hours'],
-            'minutes': objs['stats']['minutes'],
-            'items':   bagItemsToVersion2(objs['items']),
-            'cloneFirstinParty': False,
-            'pkmn': [a['data'] for a in objs['pkmns']],
-            'fullPokedex': False,
-            'pokedex': objs['pokedex'],
-        }
+        # The Hall of Fame, Trainer Hill and Recorded Battle sectors are not needed for the merge
+        _, objs = processSavFile(args.merge, fields=SAVE_FIELDS)
+        tamperObject = getMergeTamperObject(objs)
     ##
     #
-    sectors, objs = processSavFile(args.input_file, tamperObject)
+    sectors, objs = processSavFile(args.input_file, tamperObject, args.only)
+    if args.sort_boxes or args.compact_boxes:
+        order = reorderBoxes(sectors['SLOT1_PKMNSTORAGE']['data'], sort=args.sort_boxes)
+        newSlots = {slot: i for i, slot in enumerate(order)}
+        for pkmn in objs['pkmns']: # The mons that were already decoded are moved in the report
+            if pkmn['box'] != 0:
+                slot = newSlots[(pkmn['box']-1)*PKMN_PER_BOX + pkmn['pos']-1]
+                pkmn['box'], pkmn['pos'] = slot // PKMN_PER_BOX + 1, slot % PKMN_PER_BOX + 1
+        objs['pkmns'].sort(key=lambda pkmn: (pkmn['box'], pkmn['pos']))
     printObjects(objs)
     if args.output_file:
         saveSectors(sectors,args.output_file)